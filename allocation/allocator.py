@@ -0,0 +1,71 @@
+import heapq
+from itertools import count
+
+class AllocationPolicy:
+    def __init__(self, group_by=('gender', 'department', 'year')):
+        self.group_by = tuple(group_by)
+
+    def group_of(self, student):
+        return tuple(getattr(student, field) for field in self.group_by)
+
+class AllocationResult:
+    def __init__(self):
+        self.placed = []
+        self.unplaced = []
+
+    @property
+    def touched_rooms(self):
+        return list({id(room): room for _, room in self.placed}.values())
+
+# Every room holds a single policy group. Rooms already used by a group keep
+# taking that group and the rest come from a pool of empty rooms; both are
+# heaps, so each placement costs O(log rooms).
+class RoomAllocator:
+    def __init__(self, rooms, policy):
+        self.policy = policy
+        self._sequence = count()
+        # group -> heap of (free beds, seq, room) for rooms already used by that group
+        self.group_rooms = {}
+        # heap of (-capacity, seq, room) for rooms with nobody in them yet
+        self.empty_rooms = []
+        for room in rooms:
+            free_beds = room.capacity - len(room.occupants)
+            if free_beds <= 0:
+                continue
+            if not room.occupants:
+                heapq.heappush(self.empty_rooms, (-room.capacity, next(self._sequence), room))
+                continue
+            groups = {policy.group_of(occupant) for occupant in room.occupants}
+            if len(groups) == 1:
+                self._push_group_room(groups.pop(), room, free_beds)
+
+    def _push_group_room(self, group, room, free_beds):
+        heap = self.group_rooms.setdefault(group, [])
+        heapq.heappush(heap, (free_beds, next(self._sequence), room))
+
+    def _take_room(self, group):
+        heap = self.group_rooms.get(group)
+        # Fill the fullest room of the group first so empty rooms stay
+        # available for groups that have none yet.
+        if heap:
+            return heapq.heappop(heap)[2]
+        if self.empty_rooms:
+            return heapq.heappop(self.empty_rooms)[2]
+        return None
+
+    def allocate(self, students):
+        result = AllocationResult()
+        for student in students:
+            if student.room is not None:
+                result.unplaced.append((student, "Already allocated"))
+                continue
+            group = self.policy.group_of(student)
+            room = self._take_room(group)
+            if room is None or not room.add_occupant(student):
+                result.unplaced.append((student, "No vacant room for group"))
+                continue
+            result.placed.append((student, room))
+            free_beds = room.capacity - len(room.occupants)
+            if free_beds > 0:
+                self._push_group_room(group, room, free_beds)
+        return result
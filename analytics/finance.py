@@ -0,0 +1,151 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from models.compact import from_micros, to_micros
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DAY = 86400 * 1000000
+# Days overdue at the upper end of each bucket; anything later is 90+.
+AGING_LIMITS = (30, 60, 90)
+AGING_BUCKETS = ('0-30', '31-60', '61-90', '90+')
+UNKNOWN = "Unknown"
+
+class PaymentColumns:
+    # One array per field, one entry per payment. Department and year are
+    # stored as small integer codes into the labels lists, so grouping is a
+    # bincount rather than a dict lookup per payment.
+    def __init__(self, payment_records, user_records, use_numpy=None):
+        self.departments = [UNKNOWN]
+        self.years = [UNKNOWN]
+        department_codes = {UNKNOWN: 0}
+        year_codes = {UNKNOWN: 0}
+        students = {}
+        for user in user_records:
+            if user.get('role') != 'student':
+                continue
+            department = user.get('department') or UNKNOWN
+            year = str(user.get('year') or UNKNOWN)
+            if department not in department_codes:
+                department_codes[department] = len(self.departments)
+                self.departments.append(department)
+            if year not in year_codes:
+                year_codes[year] = len(self.years)
+                self.years.append(year)
+            students[user['student_id']] = (department_codes[department], year_codes[year])
+
+        self.amounts = array('d')
+        self.due = array('q')
+        self.paid = array('b')
+        self.department = array('i')
+        self.year = array('i')
+        unknown = (0, 0)
+        for payment in payment_records:
+            department, year = students.get(payment['student'], unknown)
+            self.amounts.append(payment['amount'])
+            self.due.append(to_micros(payment['due_date']))
+            self.paid.append(1 if payment['paid'] else 0)
+            self.department.append(department)
+            self.year.append(year)
+        self.use_numpy = numpy is not None and use_numpy is not False
+
+    @classmethod
+    def from_storage(cls, data_manager, use_numpy=None):
+        return cls(data_manager.get_payments(), data_manager.get_users(), use_numpy)
+
+    def __len__(self):
+        return len(self.amounts)
+
+def finance_report(columns, as_of=None):
+    as_of = to_micros(as_of or datetime.now())
+    if columns.use_numpy:
+        report = _numpy_report(columns, as_of)
+    else:
+        report = _python_report(columns, as_of)
+    report['as_of'] = from_micros(as_of).isoformat()
+    report['payments'] = len(columns)
+    report['collection_rate'] = (report['collected'] / report['billed']
+                                 if report['billed'] else None)
+    report['collection_rate_by_department'] = {
+        department: report['collected_by_department'].get(department, 0.0) / billed
+        for department, billed in report['billed_by_department'].items()}
+    return report
+
+def _labelled(labels, totals):
+    return {label: float(total) for label, total in zip(labels, totals) if total}
+
+def _numpy_report(columns, as_of):
+    amounts = numpy.frombuffer(columns.amounts, dtype=numpy.float64)
+    due = numpy.frombuffer(columns.due, dtype=numpy.int64)
+    paid = numpy.frombuffer(columns.paid, dtype=numpy.int8).astype(bool)
+    department = numpy.frombuffer(columns.department, dtype=numpy.int32)
+    year = numpy.frombuffer(columns.year, dtype=numpy.int32)
+    departments = len(columns.departments)
+
+    unpaid_amounts = numpy.where(paid, 0.0, amounts)
+    is_due = due <= as_of
+    overdue = is_due & ~paid
+    days = (as_of - due[overdue]) // DAY
+    buckets = numpy.searchsorted(numpy.array(AGING_LIMITS), days, side='left')
+    due_amounts = numpy.where(is_due, amounts, 0.0)
+    collected_amounts = numpy.where(is_due & paid, amounts, 0.0)
+    billed_by_department = numpy.bincount(department, weights=due_amounts, minlength=departments)
+    collected_by_department = numpy.bincount(department, weights=collected_amounts,
+                                             minlength=departments)
+    return {
+        'outstanding': float(unpaid_amounts.sum()),
+        'overdue': float(amounts[overdue].sum()),
+        'billed': float(due_amounts.sum()),
+        'collected': float(collected_amounts.sum()),
+        'outstanding_by_department': _labelled(columns.departments, numpy.bincount(
+            department, weights=unpaid_amounts, minlength=departments)),
+        'outstanding_by_year': _labelled(columns.years, numpy.bincount(
+            year, weights=unpaid_amounts, minlength=len(columns.years))),
+        'aging': dict(zip(AGING_BUCKETS, map(float, numpy.bincount(
+            buckets, weights=amounts[overdue], minlength=len(AGING_BUCKETS))))),
+        'aging_counts': dict(zip(AGING_BUCKETS, map(int, numpy.bincount(
+            buckets, minlength=len(AGING_BUCKETS))))),
+        'billed_by_department': _labelled(columns.departments, billed_by_department),
+        'collected_by_department': _labelled(columns.departments, collected_by_department),
+    }
+
+def _python_report(columns, as_of):
+    # Same figures in a single pass over the arrays, for installs without
+    # NumPy.
+    outstanding_by_department = [0.0] * len(columns.departments)
+    outstanding_by_year = [0.0] * len(columns.years)
+    billed_by_department = [0.0] * len(columns.departments)
+    collected_by_department = [0.0] * len(columns.departments)
+    aging = [0.0] * len(AGING_BUCKETS)
+    aging_counts = [0] * len(AGING_BUCKETS)
+    overdue_total = 0.0
+    for amount, due, paid, department, year in zip(columns.amounts, columns.due, columns.paid,
+                                                   columns.department, columns.year):
+        if not paid:
+            outstanding_by_department[department] += amount
+            outstanding_by_year[year] += amount
+        if due > as_of:
+            continue
+        billed_by_department[department] += amount
+        if paid:
+            collected_by_department[department] += amount
+            continue
+        overdue_total += amount
+        bucket = bisect_left(AGING_LIMITS, (as_of - due) // DAY)
+        aging[bucket] += amount
+        aging_counts[bucket] += 1
+    return {
+        'outstanding': sum(outstanding_by_department),
+        'overdue': overdue_total,
+        'billed': sum(billed_by_department),
+        'collected': sum(collected_by_department),
+        'outstanding_by_department': _labelled(columns.departments, outstanding_by_department),
+        'outstanding_by_year': _labelled(columns.years, outstanding_by_year),
+        'aging': dict(zip(AGING_BUCKETS, aging)),
+        'aging_counts': dict(zip(AGING_BUCKETS, aging_counts)),
+        'billed_by_department': _labelled(columns.departments, billed_by_department),
+        'collected_by_department': _labelled(columns.departments, collected_by_department),
+    }
@@ -1,58 +1,165 @@
-from models.user import User, Admin, Manager, Student
+from concurrent.futures import ProcessPoolExecutor
+from auth.sessions import SessionCache
+from models.user import User, Admin, Manager, Student, hash_password
+
+STUDENT_FIELDS = ('student_id', 'contact_info', 'gender', 'department', 'year')
 
 class Authenticator:
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, max_sessions=10000, session_ttl=30 * 60):
         self.data_manager = data_manager
+        self.users_by_username = {}
+        self.students_by_id = {}
+        self.sessions = SessionCache(max_sessions, session_ttl)
         self.users = self.load_users()
 
     def load_users(self):
         users = []
+        self.users_by_username = {}
+        self.students_by_id = {}
         for user_data in self.data_manager.get_users():
-            if user_data['role'] == 'admin':
-                user = Admin(user_data['username'], user_data['password'])
-            elif user_data['role'] == 'manager':
-                user = Manager(user_data['username'], user_data['password'])
-            elif user_data['role'] == 'student':
-                user = Student(user_data['username'], user_data['password'],
-                               user_data['student_id'], user_data['contact_info'],
-                               user_data['gender'], user_data['department'], user_data['year'])
-            else:
+            user = self._build_user(user_data['username'], user_data['password'],
+                                    user_data['role'], user_data, hashed=True)
+            if user is None:
                 continue
             users.append(user)
+            self._index_user(user)
+        self.sessions.rebind(self.users_by_username)
         return users
 
-    def register_user(self, username, password, role, **kwargs):
-        if any(user.username == username for user in self.users):
-            raise ValueError("Username already exists")
-
+    def _build_user(self, username, password, role, fields, hashed=False):
         if role == "admin":
-            user = Admin(username, password)
-        elif role == "manager":
-            user = Manager(username, password)
-        elif role == "student":
-            user = Student(username, password, **kwargs)
-        else:
+            return Admin(username, password, hashed)
+        if role == "manager":
+            return Manager(username, password, hashed)
+        if role == "student":
+            return Student(username, password, *(fields[field] for field in STUDENT_FIELDS),
+                           hashed=hashed)
+        return None
+
+    def _index_user(self, user):
+        self.users_by_username[user.username] = user
+        if isinstance(user, Student):
+            self.students_by_id[user.student_id] = user
+
+    def add_user_record(self, user_data):
+        # For users another process has already saved.
+        if user_data['username'] in self.users_by_username:
+            return None
+        user = self._build_user(user_data['username'], user_data['password'],
+                                user_data['role'], user_data, hashed=True)
+        if user is not None:
+            self.users.append(user)
+            self._index_user(user)
+        return user
+
+    def find_user(self, item_id, key=None):
+        user = None
+        if key != 'student_id':
+            user = self.users_by_username.get(item_id)
+        if user is None and key != 'username':
+            user = self.students_by_id.get(item_id)
+        return user
+
+    def _validate_new_user(self, username, role, kwargs, usernames=(), student_ids=()):
+        if not username:
+            raise ValueError("Username is required")
+        if username in self.users_by_username or username in usernames:
+            raise ValueError("Username already exists")
+        if role not in ("admin", "manager", "student"):
             raise ValueError("Invalid role")
-        
+        if role == "student":
+            missing = [field for field in STUDENT_FIELDS if field not in kwargs]
+            if missing:
+                raise ValueError(f"Missing student fields: {', '.join(missing)}")
+            student_id = kwargs['student_id']
+            if student_id in self.students_by_id or student_id in student_ids:
+                raise ValueError("Student ID already exists")
+
+    def register_user(self, username, password, role, **kwargs):
+        self._validate_new_user(username, role, kwargs)
+        user = self._build_user(username, password, role, kwargs)
         self.users.append(user)
+        self._index_user(user)
         self.data_manager.add_user(user)
         return user
 
+    def register_users_bulk(self, rows, workers=None, processes=False, hashed=False):
+        report = []
+        accepted = []
+        usernames = set()
+        student_ids = set()
+        for row_number, row in enumerate(rows):
+            fields = dict(row)
+            username = fields.pop('username', None)
+            password = fields.pop('password', None)
+            role = fields.pop('role', 'student')
+            entry = {'row': row_number, 'username': username, 'success': False, 'error': None}
+            report.append(entry)
+            try:
+                if not password:
+                    raise ValueError("Password is required")
+                self._validate_new_user(username, role, fields, usernames, student_ids)
+            except ValueError as e:
+                entry['error'] = str(e)
+                continue
+            usernames.add(username)
+            if role == "student":
+                student_ids.add(fields['student_id'])
+            accepted.append((entry, username, password, role, fields))
+
+        passwords = [row[2] for row in accepted]
+        if hashed:
+            # Users moved from another store, passwords already hashed.
+            hashes = passwords
+        elif processes:
+            # SHA-256 of a short password never releases the GIL, so only
+            # separate processes help, and only for batches large enough to
+            # pay for starting them.
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                hashes = list(executor.map(hash_password, passwords,
+                                           chunksize=max(1, len(passwords) // 64)))
+        else:
+            hashes = [hash_password(password) for password in passwords]
+
+        users = []
+        for (entry, username, _, role, fields), password_hash in zip(accepted, hashes):
+            user = self._build_user(username, password_hash, role, fields, hashed=True)
+            users.append(user)
+            self._index_user(user)
+            entry['success'] = True
+        self.users.extend(users)
+        if users:
+            self.data_manager.add_users(users)
+        return report
+
     def login(self, username, password):
-        for user in self.users:
-            if user.username == username and user.check_password(password):
-                return user
+        user = self.users_by_username.get(username)
+        if user and user.check_password(password):
+            return user
         return None
 
+    def create_session(self, username, password):
+        user = self.login(username, password)
+        if user is None:
+            return None
+        return self.sessions.create(user)
+
+    def validate(self, token):
+        # No hashing and no user lookup: a token is only ever issued after
+        # the password has been checked.
+        return self.sessions.get(token)
+
+    def logout(self, token):
+        return self.sessions.revoke(token)
+
     def change_password(self, user, old_password, new_password):
         if user.check_password(old_password):
             user.password = user._hash_password(new_password)
-            self.data_manager.update_data('users', user.username, {'password': user.password})
+            self.data_manager.update_data('users', user.username, {'password': user.password},
+                                          key='username')
+            self.sessions.revoke_user(user.username)
             return True
         return False
 
     def get_user_by_id(self, student_id):
-        for user in self.users:
-            if isinstance(user, Student) and user.student_id == student_id:
-                return user
-        return None
\ No newline at end of file
+        return self.students_by_id.get(student_id)
\ No newline at end of file
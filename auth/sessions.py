@@ -0,0 +1,77 @@
+import secrets
+import time
+from collections import OrderedDict
+
+class SessionCache:
+    # token -> (user, last used). Kept in last-use order, so the least
+    # recently used session is first to go when full, and idle sessions
+    # collect at the front where expiry finds them cheaply.
+    def __init__(self, max_size=10000, ttl=30 * 60, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.by_username = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def create(self, user):
+        now = self.clock()
+        self._expire(now)
+        while len(self.entries) >= self.max_size:
+            self._remove(next(iter(self.entries)))
+        token = secrets.token_urlsafe(32)
+        self.entries[token] = (user, now)
+        self.by_username.setdefault(user.username, set()).add(token)
+        return token
+
+    def get(self, token):
+        entry = self.entries.get(token)
+        if entry is None:
+            return None
+        user, last_used = entry
+        now = self.clock()
+        if now - last_used > self.ttl:
+            self._remove(token)
+            return None
+        self.entries[token] = (user, now)
+        self.entries.move_to_end(token)
+        return user
+
+    def revoke(self, token):
+        if token in self.entries:
+            self._remove(token)
+            return True
+        return False
+
+    def revoke_user(self, username):
+        tokens = list(self.by_username.get(username, ()))
+        for token in tokens:
+            self._remove(token)
+        return len(tokens)
+
+    def rebind(self, users_by_username):
+        # After users are reloaded, point sessions at the new objects and
+        # drop those whose user is gone.
+        for token, (user, last_used) in list(self.entries.items()):
+            current = users_by_username.get(user.username)
+            if current is None:
+                self._remove(token)
+            else:
+                self.entries[token] = (current, last_used)
+
+    def _expire(self, now):
+        while self.entries:
+            token, (_, last_used) = next(iter(self.entries.items()))
+            if now - last_used <= self.ttl:
+                break
+            self._remove(token)
+
+    def _remove(self, token):
+        user, _ = self.entries.pop(token)
+        tokens = self.by_username.get(user.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self.by_username[user.username]
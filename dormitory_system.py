@@ -1,52 +1,274 @@
+import json
+import os
+from contextlib import contextmanager
+from allocation.allocator import AllocationPolicy, RoomAllocator
+from analytics.finance import PaymentColumns, finance_report
 from auth.authenticator import Authenticator
+from indexes.occupancy import OccupancyStats
+from indexes.payment_index import PaymentIndex
+from indexes.request_store import MaintenanceRequestStore, page
+from indexes.text_index import TextIndex
+from metrics import registry as metrics
 from models.room import Room
 from models.maintenance import MaintenanceRequest
+from models.compact import pack_id
 from models.payment import Payment
-from storage.data_manager import DataManager
+from storage.factory import create_data_manager
+from storage.transfer import (CHUNK_SIZE, COLUMNS, FORMATS, collection_path, export_all,
+                              open_records)
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from models.user import Student, Admin, Manager
 
 
 class DormitoryManagementSystem:
     """Some docstring here."""
-    def __init__(self, data_file_path):
-        self.data_manager = DataManager(data_file_path)
+    def __init__(self, data_file_path, journal=False, backend=None, group_commit=None,
+                 enable_metrics=False, manual_flush=False):
+        options = {key: value for key, value in
+                   (('journal', journal), ('group_commit', group_commit),
+                    ('manual_flush', manual_flush)) if value}
+        if enable_metrics:
+            metrics.enable(DormitoryManagementSystem, Authenticator)
+        self.data_manager = create_data_manager(data_file_path, backend, **options)
+        if enable_metrics:
+            metrics.instrument(type(self.data_manager))
         self.authenticator = Authenticator(self.data_manager)
-        self.rooms = self.load_rooms()
-        self.maintenance_requests = self.load_maintenance_requests()
-        self.payments = self.load_payments()
         self.current_user = None
+        self._clear_caches()
+
+    def _clear_caches(self):
+        self._rooms = None
+        self._rooms_by_number = {}
+        self._occupancy = None
+        self._maintenance_requests = None
+        self._payments = None
+        self._payment_index = None
+        self._request_cache = {}
+        self._payment_cache = {}
+        self._text_index = None
+        self._finance_columns = None
+
+    @property
+    def rooms(self):
+        self._ensure_rooms()
+        return self._rooms
+
+    def _ensure_rooms(self):
+        # Restoring occupants also sets each student's room.
+        if self._rooms is None:
+            self._rooms = self.load_rooms()
+            self._rooms_by_number = {room.room_number: room for room in self._rooms}
+            self._occupancy = OccupancyStats()
+            for room in self._rooms:
+                self._track_room(room)
+
+    def _track_room(self, room):
+        self._occupancy.room_added(room)
+        room.stats = self._occupancy
+
+    def sync(self):
+        # Pick up what other processes sharing the data file have written.
+        changes = self.data_manager.refresh()
+        if changes is None:
+            self.authenticator.users = self.authenticator.load_users()
+            if self.current_user is not None:
+                self.current_user = self.authenticator.users_by_username.get(
+                    self.current_user.username)
+            self._clear_caches()
+            return
+        for record in changes:
+            getattr(self, f"_sync_{record['category']}")(record)
+        if changes:
+            self._finance_columns = None
+
+    @contextmanager
+    def _up_to_date(self):
+        # Hold the data file and catch up with the other desks first, so the
+        # checks made inside see every write so far and nothing can land
+        # between a check and the write it guards.
+        with self.data_manager.transaction():
+            self.sync()
+            yield
+
+    def _sync_users(self, record):
+        if record['op'] == 'add':
+            self.authenticator.add_user_record(record['item'])
+            return
+        user = self.authenticator.find_user(record['id'], record.get('key'))
+        if user is None:
+            return
+        updates = record['updates']
+        if 'password' in updates:
+            user.password = updates['password']
+            self.authenticator.sessions.revoke_user(user.username)
+        # Room changes arrive with the matching rooms record.
+        if isinstance(user, Student):
+            previous = (user.gender, user.department, user.year)
+            user.edit_profile(updates.get('contact_info'), updates.get('gender'),
+                              updates.get('department'), updates.get('year'))
+            if user.room and user.room.stats and previous != (user.gender, user.department,
+                                                              user.year):
+                user.room.stats.profile_changed(user, *previous)
+
+    def _sync_rooms(self, record):
+        # Unloaded rooms are read fresh from storage when first needed.
+        if self._rooms is None:
+            return
+        if record['op'] == 'add':
+            room = self._build_room(record['item'])
+            self._rooms.append(room)
+            self._rooms_by_number[room.room_number] = room
+            self._track_room(room)
+            return
+        room = self._rooms_by_number.get(record['id'])
+        if room is None or 'occupants' not in record['updates']:
+            return
+        occupant_ids = record['updates']['occupants']
+        for student in [o for o in room.occupants if o.student_id not in occupant_ids]:
+            room.remove_occupant(student)
+        current = {o.student_id for o in room.occupants}
+        for student_id in occupant_ids:
+            student = self.authenticator.get_user_by_id(student_id)
+            if student and student_id not in current:
+                if student.room is not None:
+                    student.room.remove_occupant(student)
+                room.add_occupant(student)
+
+    def _sync_maintenance_requests(self, record):
+        if record['op'] == 'add':
+            if self._maintenance_requests is not None:
+                self._maintenance_requests.add(self._hydrate_request(record['item']))
+            if self._text_index is not None:
+                self._text_index.add_record(record['item'])
+            return
+        if self._text_index is not None and 'status' in record['updates']:
+            self._text_index.update_status(record['id'], record['updates']['status'])
+        request = self._request_cache.get(pack_id(record['id']))
+        if request is None or 'status' not in record['updates']:
+            return
+        if self._maintenance_requests is not None:
+            self._maintenance_requests.update_status(request, record['updates']['status'])
+        else:
+            request.update_status(record['updates']['status'])
+
+    def _sync_payments(self, record):
+        if record['op'] == 'add':
+            if self._payments is not None:
+                payment = self._hydrate_payment(record['item'])
+                self._payments.append(payment)
+                if self._payment_index is not None:
+                    self._payment_index.add(payment)
+            return
+        payment = self._payment_cache.get(pack_id(record['id']))
+        if payment is None or not record['updates'].get('paid') or payment.paid:
+            return
+        if self._payment_index is not None:
+            self._payment_index.mark_paid(payment)
+        else:
+            payment.mark_as_paid()
+
+    def get_occupancy_stats(self):
+        self._ensure_rooms()
+        return self._occupancy.as_dict()
+
+    @property
+    def maintenance_requests(self):
+        if self._maintenance_requests is None:
+            self._maintenance_requests = self.load_maintenance_requests()
+        return self._maintenance_requests
+
+    @property
+    def text_index(self):
+        if self._text_index is None:
+            self._text_index = TextIndex.open(self.data_manager.file_path + '.textidx',
+                                              self.data_manager.get_maintenance_requests())
+        return self._text_index
+
+    @property
+    def payments(self):
+        if self._payments is None:
+            self._payments = self.load_payments()
+        return self._payments
+
+    @property
+    def payment_index(self):
+        if self._payment_index is None:
+            self._payment_index = PaymentIndex(self.payments)
+        return self._payment_index
 
     def load_rooms(self):
-        rooms = []
-        for room_data in self.data_manager.get_rooms():
-            room = Room(room_data['room_number'], room_data['capacity'])
-            rooms.append(room)
-        return rooms
+        return [self._build_room(room_data) for room_data in self.data_manager.get_rooms()]
 
-    def load_maintenance_requests(self):
-        requests = []
-        for request_data in self.data_manager.get_maintenance_requests():
+    def _build_room(self, room_data):
+        room = Room(room_data['room_number'], room_data['capacity'])
+        for student_id in room_data.get('occupants', []):
+            student = self.authenticator.get_user_by_id(student_id)
+            if student:
+                room.add_occupant(student)
+        return room
+
+    def _hydrate_request(self, request_data):
+        request = self._request_cache.get(pack_id(request_data['id']))
+        if request is None:
             student = self.authenticator.get_user_by_id(request_data['student'])
-            request = MaintenanceRequest(student, request_data['description'])
-            request.id = request_data['id']
-            request.status = request_data['status']
-            request.created_at = datetime.fromisoformat(request_data['created_at'])
-            requests.append(request)
-        return requests
+            request = MaintenanceRequest.from_record(request_data, student)
+            self._request_cache[request.key] = request
+        return request
 
-    def load_payments(self):
-        payments = []
-        for payment_data in self.data_manager.get_payments():
+    def _hydrate_payment(self, payment_data):
+        payment = self._payment_cache.get(pack_id(payment_data['id']))
+        if payment is None:
             student = self.authenticator.get_user_by_id(payment_data['student'])
-            payment = Payment(student, payment_data['amount'], 
-                              datetime.fromisoformat(payment_data['due_date']))
-            payment.paid = payment_data['paid']
-            payments.append(payment)
-        return payments
+            payment = Payment.from_record(payment_data, student)
+            self._payment_cache[payment.key] = payment
+        return payment
+
+    def load_maintenance_requests(self):
+        return MaintenanceRequestStore(self._hydrate_request(request_data) for request_data
+                                       in self.data_manager.get_maintenance_requests())
+
+    def load_payments(self):
+        return [self._hydrate_payment(payment_data)
+                for payment_data in self.data_manager.get_payments()]
+
+    def get_student_maintenance_requests(self, student, offset=0, limit=None):
+        if self._maintenance_requests is not None:
+            return self._maintenance_requests.for_student(student.student_id, offset, limit)
+        return page((self._hydrate_request(request_data) for request_data in
+                     self.data_manager.get_student_maintenance_requests(student.student_id)),
+                    offset, limit)
+
+    def list_maintenance_requests(self, status=None, offset=0, limit=None):
+        if status:
+            return self.maintenance_requests.with_status(status, offset, limit)
+        return self.maintenance_requests.all(offset, limit)
+
+    def next_pending_requests(self, count):
+        return self.list_maintenance_requests("Pending", limit=count)
+
+    def get_student_payments(self, student):
+        if self._payment_index is not None:
+            return self._payment_index.for_student(student.student_id)
+        return [self._hydrate_payment(payment_data) for payment_data in
+                self.data_manager.get_student_payments(student.student_id)]
+
+    def get_room(self, room_number):
+        self._ensure_rooms()
+        return self._rooms_by_number.get(room_number)
+
+    def get_student_room(self, student):
+        self._ensure_rooms()
+        return student.room
 
     def register_user(self, username, password, role, **kwargs):
-        return self.authenticator.register_user(username, password, role, **kwargs)
+        with self._up_to_date():
+            return self.authenticator.register_user(username, password, role, **kwargs)
+
+    def register_users_bulk(self, rows, workers=None, processes=False, hashed=False):
+        with self._up_to_date():
+            return self.authenticator.register_users_bulk(rows, workers, processes, hashed)
 
     def login(self, username, password):
         user = self.authenticator.login(username, password)
@@ -58,24 +280,97 @@ class DormitoryManagementSystem:
     def logout(self):
         self.current_user = None
 
+    def close(self):
+        self.data_manager.close()
+        if self._text_index is not None and self._text_index.dirty:
+            self._text_index.save(self.data_manager.file_path + '.textidx')
+
     def change_password(self, old_password, new_password):
         if self.current_user:
             return self.authenticator.change_password(self.current_user, old_password, new_password)
         return False
 
     def add_room(self, room_number, capacity):
-        room = Room(room_number, capacity)
-        self.rooms.append(room)
-        self.data_manager.add_room(room)
+        with self._up_to_date():
+            if self.get_room(room_number) is not None:
+                raise ValueError(f"Room {room_number} already exists")
+            room = Room(room_number, capacity)
+            self.rooms.append(room)
+            self._rooms_by_number[room_number] = room
+            self._track_room(room)
+            self.data_manager.add_room(room)
 
     def allocate_room(self, student, room):
-        if isinstance(self.current_user, (Admin, Manager)):
-            if room.add_occupant(student):
-                self.data_manager.update_data('rooms', room.room_number, 
-                                              {'occupants': [o.student_id for o in room.occupants]})
-                self.data_manager.update_data('users', student.student_id, {'room': room.room_number})
-                return True
-        return False
+        if not isinstance(self.current_user, (Admin, Manager)):
+            return False
+        with self._up_to_date():
+            # What the caller holds may predate a reload; capacity is checked
+            # against the stored room, which every desk writes to.
+            student = self.search_student(student.student_id)
+            room = self.get_room(room.room_number)
+            # Someone already housed has to be moved out first; placing them
+            # again would count them in two rooms.
+            if student is None or room is None or student.room is not None:
+                return False
+            stored = self.data_manager.find('rooms', room.room_number, key='room_number')
+            if stored is None:
+                return False
+            occupants = list(stored.get('occupants', []))
+            if student.student_id in occupants or len(occupants) >= stored['capacity']:
+                return False
+            if not room.add_occupant(student):
+                return False
+            occupants.append(student.student_id)
+            self.data_manager.update_data('rooms', room.room_number, {'occupants': occupants},
+                                          key='room_number')
+            self.data_manager.update_data('users', student.student_id,
+                                          {'room': room.room_number}, key='student_id')
+            return True
+
+    def allocate_rooms_bulk(self, students, policy=None):
+        if not isinstance(self.current_user, (Admin, Manager)):
+            return None
+        with self._up_to_date():
+            # Another desk may have housed some of them meanwhile; the
+            # allocator reports those from their current state.
+            current = [(student, self.search_student(student.student_id)) for student in students]
+            result = RoomAllocator(self.rooms, policy or AllocationPolicy()).allocate(
+                [student for _, student in current if student is not None])
+            result.unplaced += [(student, "Not registered")
+                                for student, found in current if found is None]
+            changes = [('rooms', room.room_number,
+                        {'occupants': [o.student_id for o in room.occupants]}, 'room_number')
+                       for room in result.touched_rooms]
+            changes += [('users', student.student_id, {'room': room.room_number}, 'student_id')
+                        for student, room in result.placed]
+            if changes:
+                self.data_manager.update_many(changes)
+            return result
+
+    def unallocated_students(self):
+        self._ensure_rooms()
+        return [user for user in self.authenticator.users
+                if isinstance(user, Student) and user.room is None]
+
+    def edit_profile(self, contact_info=None, gender=None, department=None, year=None):
+        if not isinstance(self.current_user, Student):
+            return False
+        with self._up_to_date():
+            # Fields left unchanged are written back too, so start from the
+            # latest ones.
+            student = self.current_user
+            previous = (student.gender, student.department, student.year)
+            student.edit_profile(contact_info, gender, department, year)
+            if self.get_student_room(student) and student.room.stats:
+                student.room.stats.profile_changed(student, *previous)
+            self._finance_columns = None
+            self.data_manager.update_data('users', student.student_id,
+                                          {'contact_info': student.contact_info,
+                                           'gender': student.gender,
+                                           'department': student.department,
+                                           'year': student.year},
+                                          key='student_id')
+            return True
 
     def search_student(self, student_id):
         return self.authenticator.get_user_by_id(student_id)
@@ -86,36 +381,247 @@ class DormitoryManagementSystem:
     def create_maintenance_request(self, description):
         if isinstance(self.current_user, Student):
             request = MaintenanceRequest(self.current_user, description)
-            self.maintenance_requests.append(request)
+            self._request_cache[request.key] = request
+            if self._maintenance_requests is not None:
+                self._maintenance_requests.add(request)
+            if self._text_index is not None:
+                self._text_index.add(request.id, description, request.status,
+                                     request.created_at)
             self.data_manager.add_maintenance_request(request)
             return request
         return None
 
     def update_maintenance_request(self, request_id, new_status):
         if isinstance(self.current_user, (Admin, Manager)):
-            for request in self.maintenance_requests:
-                if request.id == request_id:
+            store = self._maintenance_requests
+            if store is not None:
+                request = store.get(request_id)
+            else:
+                request_data = self.data_manager.find('maintenance_requests', request_id)
+                request = self._hydrate_request(request_data) if request_data else None
+            if request:
+                if store is not None:
+                    store.update_status(request, new_status)
+                else:
                     request.update_status(new_status)
-                    self.data_manager.update_data('maintenance_requests', request_id, {'status': new_status})
-                    return True
+                if self._text_index is not None:
+                    self._text_index.update_status(request_id, new_status)
+                self.data_manager.update_data('maintenance_requests', request_id, {'status': new_status})
+                return True
         return False
 
-    def create_payment(self, student, amount, due_date):
+    def search_maintenance_requests(self, query, status=None, since=None, until=None,
+                                    prefix=True, limit=20):
+        matches = self.text_index.search(query, prefix, status, since, until, limit)
+        requests = []
+        for request_id, _ in matches:
+            request = self._request_cache.get(pack_id(request_id))
+            if request is None:
+                request = self._hydrate_request(self.data_manager.find('maintenance_requests',
+                                                                       request_id))
+            requests.append(request)
+        return requests
+
+    def create_payment(self, student, amount, due_date, paid=False, payment_id=None):
         if isinstance(self.current_user, (Admin, Manager)):
             payment = Payment(student, amount, due_date)
-            self.payments.append(payment)
+            if payment_id is not None:
+                payment.id = payment_id
+            payment.paid = paid
+            self._payment_cache[payment.key] = payment
+            if self._payments is not None:
+                self._payments.append(payment)
+            if self._payment_index is not None:
+                self._payment_index.add(payment)
+            self._finance_columns = None
             self.data_manager.add_payment(payment)
             return payment
         return None
 
+    def mark_payment_paid(self, payment_id):
+        if not isinstance(self.current_user, (Admin, Manager)):
+            return False
+        with self._up_to_date():
+            payment = self.payment_index.get(payment_id)
+            if payment and not payment.paid:
+                self.payment_index.mark_paid(payment)
+                self._finance_columns = None
+                self.data_manager.update_data('payments', payment_id, {'paid': True})
+                return True
+        return False
+
+    def get_finance_report(self, as_of=None):
+        # Columns are rebuilt only after payments or student profiles change.
+        if self._finance_columns is None:
+            self._finance_columns = PaymentColumns.from_storage(self.data_manager)
+        return finance_report(self._finance_columns, as_of)
+
+    def export_data(self, directory, fmt, categories=None, chunk_size=CHUNK_SIZE,
+                    password_hashes=False):
+        # Yields (category, path, count) per collection written.
+        yield from export_all(self.data_manager, directory, fmt, categories, chunk_size,
+                              password_hashes)
+
+    def import_records(self, category, records, batch_size=CHUNK_SIZE, password_hashes=False):
+        # Feeds records through the same checks as registering users and
+        # creating payments, committing one transaction per batch. Yields
+        # (imported, errors) per batch, errors being (row, message) pairs,
+        # so nothing grows with the size of the input.
+        if not isinstance(self.current_user, (Admin, Manager)):
+            raise ValueError("Permission denied")
+        importer = getattr(self, f"_import_{category}", None)
+        if importer is None:
+            raise ValueError(f"Unknown collection: {category}")
+        if category == 'users':
+            importer = partial(importer, hashed=password_hashes)
+        records = iter(records)
+        first_row = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            with self.data_manager.transaction():
+                imported, errors = importer(batch, first_row)
+            first_row += len(batch)
+            yield imported, errors
+
+    def import_data(self, directory, fmt, categories=None, batch_size=CHUNK_SIZE,
+                    password_hashes=False):
+        # Collections go in dependency order: students before the rooms,
+        # requests and payments that refer to them. Missing files are skipped.
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        for category in categories or COLUMNS:
+            path = collection_path(directory, category, fmt)
+            if not os.path.exists(path):
+                continue
+            for imported, errors in self.import_records(category, open_records(path, fmt),
+                                                        batch_size, password_hashes):
+                yield category, imported, errors
+
+    def _import_rows(self, batch, first_row, import_row):
+        imported = 0
+        errors = []
+        for row_number, record in enumerate(batch, first_row):
+            try:
+                import_row(record)
+            except (ValueError, TypeError, KeyError) as e:
+                errors.append((row_number, str(e)))
+            else:
+                imported += 1
+        return imported, errors
+
+    def _import_users(self, batch, first_row, hashed=False):
+        # A plain export has no passwords at all. Refuse it outright rather
+        # than reject every row, and every row in the other collections that
+        # refers to a student.
+        if not any(record.get('password') for record in batch):
+            raise ValueError("The users file has no passwords: add a password column, or "
+                             "export and import with password hashes")
+        # Only the columns registration knows about; room assignments come
+        # in with the rooms.
+        rows = [{field: value for field, value in record.items()
+                 if field != 'room' and not (field == 'role' and value is None)}
+                for record in batch]
+        report = self.register_users_bulk(rows, hashed=hashed)
+        errors = [(first_row + entry['row'], entry['error'])
+                  for entry in report if not entry['success']]
+        return len(report) - len(errors), errors
+
+    def _import_rooms(self, batch, first_row):
+        self._ensure_rooms()
+        return self._import_rows(batch, first_row, self._import_room)
+
+    def _import_room(self, record):
+        room_number = record.get('room_number')
+        if not room_number:
+            raise ValueError("Room number is required")
+        if room_number in self._rooms_by_number:
+            raise ValueError(f"Room {room_number} already exists")
+        capacity = int(record.get('capacity'))
+        if capacity < 1:
+            raise ValueError("Capacity must be positive")
+        occupants = record.get('occupants') or []
+        if isinstance(occupants, str):
+            occupants = json.loads(occupants)
+        if len(occupants) > capacity:
+            raise ValueError("More occupants than capacity")
+        students = []
+        for student_id in occupants:
+            student = self.search_student(student_id)
+            if student is None:
+                raise ValueError(f"No student with ID {student_id}")
+            if student.room is not None:
+                raise ValueError(f"Student {student_id} already has a room")
+            students.append(student)
+        self.add_room(room_number, capacity)
+        room = self._rooms_by_number[room_number]
+        for student in students:
+            self.allocate_room(student, room)
+
+    def _import_maintenance_requests(self, batch, first_row):
+        return self._import_rows(batch, first_row, self._import_request)
+
+    def _import_request(self, record):
+        student = self.search_student(record.get('student'))
+        if student is None:
+            raise ValueError(f"No student with ID {record.get('student')}")
+        if not record.get('description'):
+            raise ValueError("Description is required")
+        request = MaintenanceRequest(student, record['description'])
+        if record.get('id'):
+            if self.data_manager.find('maintenance_requests', record['id']) is not None:
+                raise ValueError(f"Maintenance request {record['id']} already exists")
+            request.id = record['id']
+        if record.get('status'):
+            request.status = record['status']
+        if record.get('created_at'):
+            request.created_at = datetime.fromisoformat(record['created_at'])
+        # Unless the requests are loaded, nothing else holds on to imported
+        # ones; they are hydrated again when needed.
+        if self._maintenance_requests is not None:
+            self._request_cache[request.key] = request
+            self._maintenance_requests.add(request)
+        if self._text_index is not None:
+            self._text_index.add(request.id, request.description, request.status,
+                                 request.created_at)
+        self.data_manager.add_maintenance_request(request)
+
+    def _import_payments(self, batch, first_row):
+        return self._import_rows(batch, first_row, self._import_payment)
+
+    def _import_payment(self, record):
+        # Payments keep their exported IDs, so importing the same file twice
+        # is refused rather than doubling them; ones without get new IDs.
+        if record.get('id') and self.data_manager.find('payments', record['id']) is not None:
+            raise ValueError(f"Payment {record['id']} already exists")
+        student = self.search_student(record.get('student'))
+        if student is None:
+            raise ValueError(f"No student with ID {record.get('student')}")
+        amount = float(record.get('amount'))
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+        due_date = datetime.fromisoformat(record.get('due_date'))
+        paid = record.get('paid')
+        if isinstance(paid, str):
+            paid = paid.strip().lower() in ('true', '1', 'yes')
+        payment = self.create_payment(student, amount, due_date, bool(paid),
+                                      record.get('id') or None)
+        if self._payments is None:
+            self._payment_cache.pop(payment.key, None)
+
     def check_payment_due(self, student):
-        for payment in self.payments:
-            if payment.student == student and not payment.paid and payment.due_date <= datetime.now():
-                return payment
-        return None
+        now = datetime.now()
+        overdue = [payment for payment in self.get_student_payments(student)
+                   if not payment.paid and payment.due_date <= now]
+        return min(overdue, key=lambda payment: payment.due_timestamp, default=None)
+
+    def sweep_overdue(self, as_of=None):
+        return self.payment_index.sweep_overdue(as_of or datetime.now())
 
     def run(self):
         while True:
+            self.sync()
             if not self.current_user:
                 print("\n1. Login")
                 print("2. Register")
@@ -132,6 +638,7 @@ class DormitoryManagementSystem:
                 elif choice == "2":
                     self.register_user_cli()
                 elif choice == "3":
+                    self.close()
                     break
                 else:
                     print("Invalid choice")
@@ -172,8 +679,104 @@ class DormitoryManagementSystem:
             except ValueError as e:
                 print(f"Registration failed: {str(e)}")
                 
+    def view_maintenance_requests_cli(self, page_size=20):
+        status = input("Filter by status (or press enter for all): ").strip()
+        offset = 0
+        while True:
+            requests = self.list_maintenance_requests(status or None, offset, page_size)
+            for request in requests:
+                print(f"ID: {request.id}, Student: {request.student.username}, "
+                      f"Description: {request.description}, Status: {request.status}")
+            if len(requests) < page_size:
+                break
+            offset += page_size
+            if input("Press enter for more, or q to stop: ").strip().lower() == "q":
+                break
+
+    def search_maintenance_requests_cli(self):
+        query = input("Search descriptions for: ").strip()
+        status = input("Filter by status (or press enter for all): ").strip()
+        since = input("Created on or after (YYYY-MM-DD, or press enter): ").strip()
+        until = input("Created on or before (YYYY-MM-DD, or press enter): ").strip()
+        try:
+            since = datetime.strptime(since, "%Y-%m-%d") if since else None
+            until = (datetime.strptime(until, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+                     if until else None)
+        except ValueError:
+            print("Invalid date")
+            return
+        requests = self.search_maintenance_requests(query, status or None, since, until)
+        if not requests:
+            print("No matching maintenance requests")
+        for request in requests:
+            print(f"ID: {request.id}, Student: {request.student.username}, "
+                  f"Created: {request.created_at:%Y-%m-%d}, Status: {request.status}, "
+                  f"Description: {request.description}")
+
+    def finance_report_cli(self):
+        report = self.get_finance_report()
+        rate = report['collection_rate']
+        print(f"Payments: {report['payments']}, as of {report['as_of'][:10]}")
+        print(f"Outstanding: {report['outstanding']:.2f}, Overdue: {report['overdue']:.2f}")
+        print(f"Collected {report['collected']:.2f} of {report['billed']:.2f} due"
+              + (f" ({rate:.1%})" if rate is not None else ""))
+        print("Overdue by age (days):")
+        for bucket, amount in report['aging'].items():
+            print(f"  {bucket}: {amount:.2f} ({report['aging_counts'][bucket]} payments)")
+        print("Outstanding by department:")
+        for department, amount in sorted(report['outstanding_by_department'].items()):
+            collection = report['collection_rate_by_department'].get(department)
+            print(f"  {department}: {amount:.2f}"
+                  + (f", {collection:.1%} collected" if collection is not None else ""))
+        print("Outstanding by year:")
+        for year, amount in sorted(report['outstanding_by_year'].items()):
+            print(f"  {year}: {amount:.2f}")
+
+    def export_data_cli(self):
+        directory = input("Export to directory: ").strip()
+        fmt = input("Format (csv/ndjson): ").strip().lower()
+        hashes = input("Include password hashes, to import users elsewhere? (y/n): ")
+        try:
+            for category, path, count in self.export_data(
+                    directory, fmt, password_hashes=hashes.strip().lower() == "y"):
+                print(f"{category}: {count} records written to {path}")
+        except (ValueError, OSError) as e:
+            print(f"Export failed: {e}")
+
+    def import_data_cli(self):
+        directory = input("Import from directory: ").strip()
+        fmt = input("Format (csv/ndjson): ").strip().lower()
+        hashes = input("Are the passwords hashes from an export? (y/n): ")
+        totals = {}
+        try:
+            for category, imported, errors in self.import_data(
+                    directory, fmt, password_hashes=hashes.strip().lower() == "y"):
+                totals[category] = totals.get(category, 0) + imported
+                for row, error in errors:
+                    print(f"{category} row {row}: {error}")
+        except (ValueError, OSError) as e:
+            print(f"Import failed: {e}")
+        for category, count in totals.items():
+            print(f"{category}: {count} records imported")
+
+    def metrics_cli(self):
+        if not metrics.METRICS.enabled:
+            print("Metrics are not enabled")
+            return
+        snapshot = metrics.METRICS.snapshot()
+        for name, value in snapshot['counters'].items():
+            print(f"{name}: {value}")
+        for name, histogram in snapshot['histograms'].items():
+            print(f"{name}: {histogram['count']} calls, mean {histogram['mean_ms']:.3f} ms, "
+                  f"max {histogram['max_ms']:.3f} ms")
+        path = input("Dump metrics to file (or press enter to skip): ").strip()
+        if path:
+            metrics.METRICS.dump(path)
+            print(f"Metrics written to {path}")
+
     def admin_menu(self):
         while True:
+            self.sync()
             print("\nAdmin Menu")
             print("1. Add Room")
             print("2. Allocate Room")
@@ -181,19 +784,29 @@ class DormitoryManagementSystem:
             print("4. Update Maintenance Request")
             print("5. Create Payment")
             print("6. View Payments")
-            print("7. Logout")
+            print("7. Allocate Rooms to Unallocated Students")
+            print("8. View Overdue Payments")
+            print("9. Mark Payment as Paid")
+            print("10. Search Maintenance Requests")
+            print("11. Finance Report")
+            print("12. Export Data")
+            print("13. Import Data")
+            print("14. Logout")
             choice = input("Enter your choice: ")
 
             if choice == "1":
                 room_number = input("Enter room number: ")
                 capacity = int(input("Enter room capacity: "))
-                self.add_room(room_number, capacity)
-                print("Room added successfully")
+                try:
+                    self.add_room(room_number, capacity)
+                    print("Room added successfully")
+                except ValueError as e:
+                    print(f"Failed to add room: {e}")
             elif choice == "2":
                 student_id = input("Enter student ID: ")
                 room_number = input("Enter room number: ")
                 student = self.search_student(student_id)
-                room = next((r for r in self.rooms if r.room_number == room_number), None)
+                room = self.get_room(room_number)
                 if student and room:
                     if self.allocate_room(student, room):
                         print("Room allocated successfully")
@@ -202,9 +815,7 @@ class DormitoryManagementSystem:
                 else:
                     print("Invalid student or room")
             elif choice == "3":
-                for request in self.maintenance_requests:
-                    print(f"ID: {request.id}, Student: {request.student.username}, "
-                          f"Description: {request.description}, Status: {request.status}")
+                self.view_maintenance_requests_cli()
             elif choice == "4":
                 request_id = input("Enter request ID: ")
                 new_status = input("Enter new status: ")
@@ -225,9 +836,35 @@ class DormitoryManagementSystem:
                     print("Invalid student ID")
             elif choice == "6":
                 for payment in self.payments:
-                    print(f"Student: {payment.student.username}, Amount: {payment.amount}, "
-                          f"Due Date: {payment.due_date}, Paid: {payment.paid}")
+                    print(f"ID: {payment.id}, Student: {payment.student.username}, "
+                          f"Amount: {payment.amount}, Due Date: {payment.due_date}, "
+                          f"Paid: {payment.paid}")
             elif choice == "7":
+                result = self.allocate_rooms_bulk(self.unallocated_students())
+                print(f"Allocated {len(result.placed)} students")
+                for student, reason in result.unplaced:
+                    print(f"Not allocated: {student.student_id} ({reason})")
+            elif choice == "8":
+                for payment in self.sweep_overdue():
+                    print(f"ID: {payment.id}, Student: {payment.student.username}, "
+                          f"Amount: {payment.amount}, Due Date: {payment.due_date}")
+            elif choice == "9":
+                payment_id = input("Enter payment ID: ")
+                if self.mark_payment_paid(payment_id):
+                    print("Payment marked as paid")
+                else:
+                    print("Failed to mark payment as paid")
+            elif choice == "10":
+                self.search_maintenance_requests_cli()
+            elif choice == "11":
+                self.finance_report_cli()
+            elif choice == "12":
+                self.export_data_cli()
+            elif choice == "13":
+                self.import_data_cli()
+            elif choice == "m":
+                self.metrics_cli()
+            elif choice == "14":
                 self.logout()
                 break
             else:
@@ -235,27 +872,31 @@ class DormitoryManagementSystem:
 
     def manager_menu(self):
         while True:
+            self.sync()
             print("\nManager Menu")
             print("1. View Rooms")
             print("2. View Students")
             print("3. View Maintenance Requests")
             print("4. Update Maintenance Request")
-            print("5. Logout")
+            print("5. Occupancy Summary")
+            print("6. Search Maintenance Requests")
+            print("7. Logout")
             choice = input("Enter your choice: ")
 
             if choice == "1":
                 for room in self.rooms:
                     print(f"Room: {room.room_number}, Capacity: {room.capacity}, "
                           f"Occupants: {len(room.occupants)}")
+                stats = self.get_occupancy_stats()
+                print(f"Rooms: {stats['total_rooms']}, Vacant rooms: {stats['vacant_rooms']}, "
+                      f"Beds: {stats['occupied_beds']}/{stats['total_beds']} occupied")
             elif choice == "2":
                 for user in self.authenticator.users:
                     if isinstance(user, Student):
                         print(f"ID: {user.student_id}, Name: {user.username}, "
                               f"Department: {user.department}, Year: {user.year}")
             elif choice == "3":
-                for request in self.maintenance_requests:
-                    print(f"ID: {request.id}, Student: {request.student.username}, "
-                          f"Description: {request.description}, Status: {request.status}")
+                self.view_maintenance_requests_cli()
             elif choice == "4":
                 request_id = input("Enter request ID: ")
                 new_status = input("Enter new status: ")
@@ -264,6 +905,17 @@ class DormitoryManagementSystem:
                 else:
                     print("Failed to update maintenance request")
             elif choice == "5":
+                stats = self.get_occupancy_stats()
+                print(f"Rooms: {stats['total_rooms']}, Vacant rooms: {stats['vacant_rooms']}")
+                print(f"Beds: {stats['occupied_beds']} occupied, {stats['vacant_beds']} vacant, "
+                      f"{stats['total_beds']} total")
+                for label, key in (("Department", 'by_department'), ("Gender", 'by_gender'),
+                                   ("Year", 'by_year')):
+                    for value, occupants in sorted(stats[key].items(), key=lambda item: str(item[0])):
+                        print(f"{label} {value}: {occupants}")
+            elif choice == "6":
+                self.search_maintenance_requests_cli()
+            elif choice == "7":
                 self.logout()
                 break
             else:
@@ -271,6 +923,7 @@ class DormitoryManagementSystem:
 
     def student_menu(self):
         while True:
+            self.sync()
             print("\nStudent Menu")
             print("1. View Profile")
             print("2. Edit Profile")
@@ -293,15 +946,14 @@ class DormitoryManagementSystem:
                 gender = input("Enter new gender (or press enter to skip): ")
                 department = input("Enter new department (or press enter to skip): ")
                 year = input("Enter new year (or press enter to skip): ")
-                self.current_user.edit_profile(contact_info, gender, department, year)
-                self.data_manager.update_data('users', self.current_user.student_id, 
-                                              self.current_user.__dict__)
+                self.edit_profile(contact_info, gender, department, year)
                 print("Profile updated successfully")
             elif choice == "3":
-                if self.current_user.room:
-                    print(f"Room Number: {self.current_user.room.room_number}")
-                    print(f"Capacity: {self.current_user.room.capacity}")
-                    print(f"Occupants: {len(self.current_user.room.occupants)}")
+                room = self.get_student_room(self.current_user)
+                if room:
+                    print(f"Room Number: {room.room_number}")
+                    print(f"Capacity: {room.capacity}")
+                    print(f"Occupants: {len(room.occupants)}")
                 else:
                     print("You are not allocated to a room yet")
             elif choice == "4":
@@ -312,15 +964,13 @@ class DormitoryManagementSystem:
                 else:
                     print("Failed to create maintenance request")
             elif choice == "5":
-                for request in self.maintenance_requests:
-                    if request.student == self.current_user:
-                        print(f"ID: {request.id}, Description: {request.description}, "
-                              f"Status: {request.status}")
+                for request in self.get_student_maintenance_requests(self.current_user):
+                    print(f"ID: {request.id}, Description: {request.description}, "
+                          f"Status: {request.status}")
             elif choice == "6":
-                for payment in self.payments:
-                    if payment.student == self.current_user:
-                        print(f"Amount: {payment.amount}, Due Date: {payment.due_date}, "
-                              f"Paid: {payment.paid}")
+                for payment in self.get_student_payments(self.current_user):
+                    print(f"Amount: {payment.amount}, Due Date: {payment.due_date}, "
+                          f"Paid: {payment.paid}")
             elif choice == "7":
                 self.logout()
                 break
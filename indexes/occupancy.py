@@ -0,0 +1,57 @@
+from collections import Counter
+
+class OccupancyStats:
+    def __init__(self):
+        self.total_rooms = 0
+        self.total_beds = 0
+        self.occupied_beds = 0
+        self.vacant_rooms = 0
+        self.by_department = Counter()
+        self.by_gender = Counter()
+        self.by_year = Counter()
+
+    def _count(self, gender, department, year, delta):
+        self.by_gender[gender] += delta
+        self.by_department[department] += delta
+        self.by_year[year] += delta
+
+    def _count_student(self, student, delta):
+        self._count(student.gender, student.department, student.year, delta)
+
+    def room_added(self, room):
+        self.total_rooms += 1
+        self.total_beds += room.capacity
+        self.occupied_beds += len(room.occupants)
+        if room.is_vacant:
+            self.vacant_rooms += 1
+        for occupant in room.occupants:
+            self._count_student(occupant, 1)
+
+    def occupant_added(self, room, student):
+        self.occupied_beds += 1
+        if not room.is_vacant:
+            self.vacant_rooms -= 1
+        self._count_student(student, 1)
+
+    def occupant_removed(self, room, student):
+        self.occupied_beds -= 1
+        if len(room.occupants) == room.capacity - 1:
+            self.vacant_rooms += 1
+        self._count_student(student, -1)
+
+    def profile_changed(self, student, gender, department, year):
+        # gender/department/year are the values before the edit.
+        self._count(gender, department, year, -1)
+        self._count_student(student, 1)
+
+    def as_dict(self):
+        return {
+            'total_rooms': self.total_rooms,
+            'total_beds': self.total_beds,
+            'occupied_beds': self.occupied_beds,
+            'vacant_beds': self.total_beds - self.occupied_beds,
+            'vacant_rooms': self.vacant_rooms,
+            'by_department': {key: value for key, value in self.by_department.items() if value},
+            'by_gender': {key: value for key, value in self.by_gender.items() if value},
+            'by_year': {key: value for key, value in self.by_year.items() if value},
+        }
@@ -0,0 +1,67 @@
+import heapq
+from itertools import count
+from models.compact import pack_id, to_micros
+
+class PaymentIndex:
+    def __init__(self, payments=()):
+        self.by_id = {}
+        self.by_student = {}
+        self._sequence = count()
+        # Min-heap of (due date, seq, payment) over payments that were unpaid
+        # when added. Entries paid since then are dropped lazily.
+        self._due = []
+        self._stale = 0
+        for payment in payments:
+            self._index(payment)
+            if not payment.paid:
+                self._due.append((payment.due_timestamp, next(self._sequence), payment))
+        heapq.heapify(self._due)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _index(self, payment):
+        self.by_id[payment.key] = payment
+        student_id = payment.student.student_id if payment.student else None
+        self.by_student.setdefault(student_id, []).append(payment)
+
+    def add(self, payment):
+        self._index(payment)
+        if not payment.paid:
+            heapq.heappush(self._due, (payment.due_timestamp, next(self._sequence), payment))
+
+    def get(self, payment_id):
+        return self.by_id.get(pack_id(payment_id))
+
+    def for_student(self, student_id):
+        return self.by_student.get(student_id, [])
+
+    def mark_paid(self, payment):
+        if payment.paid:
+            return
+        payment.mark_as_paid()
+        self._stale += 1
+        if self._stale > len(self._due) // 2:
+            self._due = [entry for entry in self._due if not entry[2].paid]
+            heapq.heapify(self._due)
+            self._stale = 0
+
+    def sweep_overdue(self, as_of):
+        # Walk the heap top-down and stop at any entry due after as_of: its
+        # whole subtree is due later still, so the walk only visits overdue
+        # (or since-paid) entries and their direct children.
+        limit = to_micros(as_of)
+        overdue = []
+        stack = [0] if self._due else []
+        while stack:
+            position = stack.pop()
+            entry = self._due[position]
+            if entry[0] > limit:
+                continue
+            if not entry[2].paid:
+                overdue.append(entry)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self._due):
+                    stack.append(child)
+        overdue.sort()
+        return [entry[2] for entry in overdue]
@@ -0,0 +1,53 @@
+from itertools import islice
+from models.compact import pack_id
+
+def page(items, offset=0, limit=None):
+    stop = offset + limit if limit is not None else None
+    return list(islice(items, offset, stop))
+
+class MaintenanceRequestStore:
+    def __init__(self, requests=()):
+        self.by_id = {}
+        # Plain dicts keep insertion order, so each status bucket is FIFO and
+        # moving a request between buckets is a pop and an insert.
+        self.by_status = {}
+        self.by_student = {}
+        for request in requests:
+            self.add(request)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def add(self, request):
+        key = request.key
+        self.by_id[key] = request
+        self.by_status.setdefault(request.status, {})[key] = request
+        student_id = request.student.student_id if request.student else None
+        self.by_student.setdefault(student_id, {})[key] = request
+
+    def get(self, request_id):
+        return self.by_id.get(pack_id(request_id))
+
+    def update_status(self, request, new_status):
+        bucket = self.by_status.get(request.status)
+        if bucket is not None:
+            bucket.pop(request.key, None)
+            if not bucket:
+                del self.by_status[request.status]
+        request.update_status(new_status)
+        self.by_status.setdefault(new_status, {})[request.key] = request
+
+    def status_counts(self):
+        return {status: len(bucket) for status, bucket in self.by_status.items()}
+
+    def with_status(self, status, offset=0, limit=None):
+        return page(self.by_status.get(status, {}).values(), offset, limit)
+
+    def for_student(self, student_id, offset=0, limit=None):
+        return page(self.by_student.get(student_id, {}).values(), offset, limit)
+
+    def all(self, offset=0, limit=None):
+        return page(self.by_id.values(), offset, limit)
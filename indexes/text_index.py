@@ -0,0 +1,204 @@
+import heapq
+import marshal
+import math
+import os
+import re
+import tempfile
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from operator import mul
+from models.compact import to_micros
+from storage.file_lock import FileLock
+
+FORMAT_VERSION = 1
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(('a', 'an', 'and', 'at', 'by', 'for', 'in', 'is', 'it', 'my', 'no', 'not',
+                       'of', 'on', 'or', 'the', 'to', 'with'))
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class TextIndex:
+    # Requests are numbered in the order they were indexed, which is also the
+    # order of the stored records, so catching up after a restart only has
+    # to index the records past the last one seen. Each term maps to two
+    # parallel arrays: document numbers and term counts.
+    def __init__(self):
+        self.ids = []
+        self.numbers = {}
+        self.statuses = []
+        self.created = array('q')
+        self.lengths = array('H')
+        # 1 / sqrt(length), so longer descriptions don't win on length alone.
+        self.norms = array('d')
+        self.postings = {}
+        self.terms = []
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, request_id, description, status, created_at):
+        number = len(self.ids)
+        self.ids.append(request_id)
+        self.numbers[request_id] = number
+        self.statuses.append(status)
+        self.created.append(to_micros(created_at))
+        tokens = tokenize(description)
+        self.lengths.append(min(len(tokens), 0xFFFF))
+        self.norms.append(1 / math.sqrt(len(tokens) or 1))
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = (array('I'), array('H'))
+                self.terms.insert(bisect_left(self.terms, token), token)
+            posting[0].append(number)
+            posting[1].append(min(count, 0xFFFF))
+        self.dirty = True
+
+    def add_record(self, record):
+        self.add(record['id'], record['description'], record['status'], record['created_at'])
+
+    def update_status(self, request_id, status):
+        number = self.numbers.get(request_id)
+        if number is not None and self.statuses[number] != status:
+            self.statuses[number] = status
+            self.dirty = True
+
+    def expand(self, token, prefix=False):
+        if not prefix:
+            return [token] if token in self.postings else []
+        start = bisect_left(self.terms, token)
+        stop = bisect_left(self.terms, token + '\uffff', start)
+        return self.terms[start:stop]
+
+    def search(self, query, prefix=True, status=None, since=None, until=None, limit=20):
+        # Every query word must match (a prefix of) some term; matches are
+        # ranked by tf-idf, normalised by description length.
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        total = len(self.ids)
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for term in self.expand(token, prefix):
+                documents, counts = self.postings[term]
+                idf = math.log(1 + total / len(documents))
+                term_scores = dict(zip(documents, map(mul, counts, repeat(idf))))
+                if not token_scores:
+                    token_scores = term_scores
+                    continue
+                # Terms sharing a prefix rarely share documents; merge in C
+                # and only add up the overlap.
+                overlap = token_scores.keys() & term_scores.keys()
+                merged = {**token_scores, **term_scores}
+                for number in overlap:
+                    merged[number] = token_scores[number] + term_scores[number]
+                token_scores = merged
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {number: scores[number] + token_scores[number]
+                          for number in scores.keys() & token_scores.keys()}
+            if not scores:
+                return []
+        numbers = scores.keys()
+        if status is not None:
+            statuses = self.statuses
+            numbers = [number for number in numbers if statuses[number] == status]
+        if since is not None or until is not None:
+            low = to_micros(since) if since is not None else -2 ** 63
+            high = to_micros(until) if until is not None else 2 ** 63 - 1
+            created = self.created
+            numbers = [number for number in numbers if low <= created[number] <= high]
+        ranked = dict(zip(numbers, map(mul, map(scores.__getitem__, numbers),
+                                       map(self.norms.__getitem__, numbers))))
+        # Numbers follow arrival order and both orderings are stable, so
+        # ties go to the newer request.
+        newest_first = sorted(ranked, reverse=True)
+        if limit:
+            best = heapq.nlargest(limit, newest_first, key=ranked.__getitem__)
+        else:
+            best = sorted(newest_first, key=ranked.__getitem__, reverse=True)
+        return [(self.ids[number], ranked[number]) for number in best]
+
+    def catch_up(self, records):
+        # Index records added since the last save and pick up any status
+        # changed meanwhile. Returns False if the records no longer line up
+        # with what was indexed, in which case the index must be rebuilt.
+        count = len(self.ids)
+        if len(records) < count or (count and records[count - 1]['id'] != self.ids[-1]):
+            return False
+        statuses = self.statuses
+        for number in range(count):
+            status = records[number]['status']
+            if statuses[number] != status:
+                statuses[number] = status
+                self.dirty = True
+        for record in records[count:]:
+            self.add_record(record)
+        return True
+
+    def save(self, path):
+        postings = {term: (documents.tobytes(), counts.tobytes())
+                    for term, (documents, counts) in self.postings.items()}
+        payload = marshal.dumps((FORMAT_VERSION, self.ids, self.statuses,
+                                 self.created.tobytes(), self.lengths.tobytes(), postings))
+        # Every process sharing the store saves its index on close. Each
+        # writes its own temporary file and renames it into place under the
+        # lock, so the saved index is always one complete copy.
+        with FileLock(path + '.lock'):
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                             prefix=os.path.basename(path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(payload)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            version, ids, statuses, created, lengths, postings = marshal.load(file)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported text index version: {version}")
+        index = cls()
+        index.ids = ids
+        index.numbers = {request_id: number for number, request_id in enumerate(ids)}
+        index.statuses = statuses
+        index.created.frombytes(created)
+        index.lengths.frombytes(lengths)
+        index.norms = array('d', [1 / math.sqrt(length or 1) for length in index.lengths])
+        for term, (documents, counts) in postings.items():
+            posting = index.postings[term] = (array('I'), array('H'))
+            posting[0].frombytes(documents)
+            posting[1].frombytes(counts)
+        index.terms = sorted(index.postings)
+        return index
+
+    @classmethod
+    def open(cls, path, records):
+        # Load the saved index when it still matches the records, otherwise
+        # build it from scratch; either way it ends up current.
+        index = None
+        if os.path.exists(path):
+            try:
+                index = cls.load(path)
+            except (OSError, ValueError, EOFError, TypeError):
+                index = None
+        if index is None or not index.catch_up(records):
+            index = cls()
+            for record in records:
+                index.add_record(record)
+        return index
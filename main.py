@@ -1,5 +1,20 @@
+import argparse
 from dormitory_system import DormitoryManagementSystem
+from metrics.registry import METRICS, profile_session
 
 if __name__ == "__main__":
-    dms = DormitoryManagementSystem("dormitory_data.json")
-    dms.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--journal", action="store_true",
+                        help="append changes to a journal; lets desks sharing the data file "
+                             "pick up each other's changes without a full reload")
+    parser.add_argument("--metrics", action="store_true", help="collect timing and I/O metrics")
+    parser.add_argument("--metrics-file", help="write collected metrics as JSON on exit")
+    parser.add_argument("--profile", help="write cProfile stats for the session to this file")
+    args = parser.parse_args()
+
+    dms = DormitoryManagementSystem("dormitory_data.json", journal=args.journal,
+                                    enable_metrics=args.metrics or bool(args.metrics_file))
+    with profile_session(args.profile):
+        dms.run()
+    if args.metrics_file:
+        METRICS.dump(args.metrics_file)
@@ -0,0 +1,118 @@
+import bisect
+import cProfile
+import functools
+import inspect
+import json
+import time
+from contextlib import contextmanager
+
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        self.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_ms': self.total,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'max_ms': self.max,
+            'buckets': {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def snapshot(self):
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'histograms': {name: histogram.as_dict()
+                           for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+METRICS = Metrics()
+
+# Interactive loops block on input(), so their latency says nothing useful.
+SKIPPED_METHODS = ('run',)
+SKIPPED_SUFFIXES = ('_menu', '_cli')
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not METRICS.enabled:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            METRICS.increment(f"{name}.calls")
+            METRICS.observe(name, time.perf_counter() - start)
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+def instrument(cls, prefix=None):
+    # Wrapping happens only when metrics are switched on, so a process that
+    # never enables them runs the original, unwrapped methods.
+    # Generators and context managers return before any of their work is
+    # done, so timing the call would only time creating them.
+    prefix = prefix or cls.__name__
+    for name, member in list(vars(cls).items()):
+        if (name.startswith('_') or not inspect.isfunction(member)
+                or getattr(member, '__metrics_wrapped__', False)
+                or inspect.isgeneratorfunction(inspect.unwrap(member))
+                or name in SKIPPED_METHODS or name.endswith(SKIPPED_SUFFIXES)):
+            continue
+        setattr(cls, name, _timed(f"{prefix}.{name}", member))
+
+def enable(*classes):
+    METRICS.enabled = True
+    for cls in classes:
+        instrument(cls)
+
+def disable():
+    METRICS.enabled = False
+
+@contextmanager
+def profile_session(path=None):
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,38 @@
+import re
+import uuid
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+CANONICAL_UUID = re.compile('[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+def to_micros(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - EPOCH) // MICROSECOND
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+def to_isoformat(value):
+    if isinstance(value, int):
+        return from_micros(value).isoformat()
+    return value
+
+def new_id():
+    return uuid.uuid4().int
+
+def pack_id(value):
+    # Canonical (lowercase, dashed) uuid strings are kept as a 128-bit int;
+    # anything else is kept as-is so it round-trips unchanged.
+    if isinstance(value, str) and CANONICAL_UUID.fullmatch(value):
+        return int(value.replace('-', ''), 16)
+    return value
+
+def unpack_id(value):
+    if isinstance(value, int):
+        digits = f"{value:032x}"
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+    return value
@@ -1,13 +1,57 @@
-import uuid
 from datetime import datetime
+from models.compact import new_id, pack_id, unpack_id, to_micros, from_micros
 
 class MaintenanceRequest:
+    __slots__ = ('_id', 'student', 'description', 'status', '_created_at')
+
     def __init__(self, student, description):
-        self.id = str(uuid.uuid4())
+        self._id = new_id()
         self.student = student
         self.description = description
         self.status = "Pending"
-        self.created_at = datetime.now()
+        self._created_at = to_micros(datetime.now())
+
+    @classmethod
+    def from_record(cls, record, student):
+        # Skips __init__ so restoring a request does not mint a new uuid.
+        request = cls.__new__(cls)
+        request._id = pack_id(record['id'])
+        request.student = student
+        request.description = record['description']
+        request.status = record['status']
+        request._created_at = to_micros(record['created_at'])
+        return request
+
+    @property
+    def id(self):
+        return unpack_id(self._id)
+
+    @property
+    def key(self):
+        # The packed id; stores and caches key on this rather than on a
+        # freshly built string.
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        self._id = pack_id(value)
+
+    @property
+    def created_at(self):
+        return from_micros(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        self._created_at = to_micros(value)
 
     def update_status(self, new_status):
-        self.status = new_status
\ No newline at end of file
+        self.status = new_status
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'student': self.student.student_id,
+            'description': self.description,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+        }
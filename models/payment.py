@@ -1,9 +1,60 @@
+from models.compact import new_id, pack_id, unpack_id, to_micros, from_micros
+
 class Payment:
+    __slots__ = ('_id', 'student', 'amount', '_due_date', 'paid')
+
     def __init__(self, student, amount, due_date):
+        self._id = new_id()
         self.student = student
         self.amount = amount
-        self.due_date = due_date
+        self._due_date = to_micros(due_date)
         self.paid = False
 
+    @classmethod
+    def from_record(cls, record, student):
+        # Skips __init__ so restoring a payment does not mint a new uuid.
+        payment = cls.__new__(cls)
+        payment._id = pack_id(record['id'])
+        payment.student = student
+        payment.amount = record['amount']
+        payment._due_date = to_micros(record['due_date'])
+        payment.paid = record['paid']
+        return payment
+
+    @property
+    def id(self):
+        return unpack_id(self._id)
+
+    @property
+    def key(self):
+        # The packed id; stores and caches key on this rather than on a
+        # freshly built string.
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        self._id = pack_id(value)
+
+    @property
+    def due_date(self):
+        return from_micros(self._due_date)
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date = to_micros(value)
+
+    @property
+    def due_timestamp(self):
+        return self._due_date
+
     def mark_as_paid(self):
         self.paid = True
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'student': self.student.student_id,
+            'amount': self.amount,
+            'due_date': self.due_date.isoformat(),
+            'paid': self.paid,
+        }
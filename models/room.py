@@ -1,13 +1,18 @@
 class Room:
+    __slots__ = ('room_number', 'capacity', 'occupants', 'stats')
+
     def __init__(self, room_number, capacity):
         self.room_number = room_number
         self.capacity = capacity
         self.occupants = []
+        self.stats = None
 
     def add_occupant(self, student):
         if len(self.occupants) < self.capacity:
             self.occupants.append(student)
             student.room = self
+            if self.stats:
+                self.stats.occupant_added(self, student)
             return True
         return False
 
@@ -15,9 +20,18 @@ class Room:
         if student in self.occupants:
             self.occupants.remove(student)
             student.room = None
+            if self.stats:
+                self.stats.occupant_removed(self, student)
             return True
         return False
 
     @property
     def is_vacant(self):
-        return len(self.occupants) < self.capacity
\ No newline at end of file
+        return len(self.occupants) < self.capacity
+
+    def to_record(self):
+        return {
+            'room_number': self.room_number,
+            'capacity': self.capacity,
+            'occupants': [occupant.student_id for occupant in self.occupants],
+        }
@@ -1,28 +1,43 @@
 import hashlib
 
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
 class User:
-    def __init__(self, username, password, role):
+    __slots__ = ('username', 'password', 'role')
+
+    def __init__(self, username, password, role, hashed=False):
         self.username = username
-        self.password = self._hash_password(password)
+        self.password = password if hashed else self._hash_password(password)
         self.role = role
 
     def _hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hash_password(password)
 
     def check_password(self, password):
         return self.password == self._hash_password(password)
 
+    def to_record(self):
+        return {'username': self.username, 'password': self.password, 'role': self.role}
+
 class Admin(User):
-    def __init__(self, username, password):
-        super().__init__(username, password, "admin")
+    __slots__ = ()
+
+    def __init__(self, username, password, hashed=False):
+        super().__init__(username, password, "admin", hashed)
 
 class Manager(User):
-    def __init__(self, username, password):
-        super().__init__(username, password, "manager")
+    __slots__ = ()
+
+    def __init__(self, username, password, hashed=False):
+        super().__init__(username, password, "manager", hashed)
 
 class Student(User):
-    def __init__(self, username, password, student_id, contact_info, gender, department, year):
-        super().__init__(username, password, "student")
+    __slots__ = ('student_id', 'contact_info', 'gender', 'department', 'year', 'room')
+
+    def __init__(self, username, password, student_id, contact_info, gender, department, year,
+                 hashed=False):
+        super().__init__(username, password, "student", hashed)
         self.student_id = student_id
         self.contact_info = contact_info
         self.gender = gender
@@ -39,3 +54,15 @@ class Student(User):
             self.department = department
         if year:
             self.year = year
+
+    def to_record(self):
+        record = super().to_record()
+        record.update({
+            'student_id': self.student_id,
+            'contact_info': self.contact_info,
+            'gender': self.gender,
+            'department': self.department,
+            'year': self.year,
+            'room': self.room.room_number if self.room else None,
+        })
+        return record
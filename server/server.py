@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dormitory_system import DormitoryManagementSystem
+from models.user import Admin, Manager, Student
+from server.rwlock import ReadWriteLock
+from storage.factory import backend_for_path
+
+# One JSON object per line each way. Requests look like
+#   {"id": 1, "op": "login", "args": {"username": "...", "password": "..."}}
+# and every response echoes the id with either "result" or "error". Login
+# returns a session token that the connection then uses; a request may also
+# carry its own "token", e.g. to resume a session on a new connection.
+OPERATIONS = {
+    'login': 'read',
+    'logout': 'read',
+    'whoami': 'read',
+    'register': 'write',
+    'change_password': 'write',
+    'edit_profile': 'write',
+    'rooms': 'read',
+    'vacant_rooms': 'read',
+    'occupancy': 'read',
+    'search_student': 'read',
+    'allocate_room': 'write',
+    'allocate_unallocated': 'write',
+    'create_maintenance_request': 'write',
+    'my_maintenance_requests': 'read',
+    'maintenance_requests': 'read',
+    'update_maintenance_request': 'write',
+    'search_maintenance_requests': 'read',
+    'create_payment': 'write',
+    'my_payments': 'read',
+    'student_payments': 'read',
+    'payment_due': 'read',
+    'overdue_payments': 'read',
+    'mark_payment_paid': 'write',
+    'finance_report': 'read',
+}
+STAFF = (Admin, Manager)
+
+def user_view(user):
+    view = {'username': user.username, 'role': user.role}
+    if isinstance(user, Student):
+        view.update({
+            'student_id': user.student_id,
+            'contact_info': user.contact_info,
+            'gender': user.gender,
+            'department': user.department,
+            'year': user.year,
+            'room': user.room.room_number if user.room else None,
+        })
+    return view
+
+def room_view(room):
+    view = room.to_record()
+    view['vacant'] = room.is_vacant
+    return view
+
+class Session:
+    def __init__(self):
+        self.token = None
+        self.user = None
+
+class DormitoryServer:
+    def __init__(self, data_file_path, journal=False, flush_interval=0.005, sync_interval=1.0):
+        # SQLite commits on its own connection, which must stay on the event
+        # loop thread; the file backends buffer writes and flush them from
+        # the worker instead.
+        self.deferred = backend_for_path(data_file_path) != 'sqlite'
+        self.dms = DormitoryManagementSystem(data_file_path, journal=journal,
+                                             manual_flush=self.deferred)
+        self.lock = ReadWriteLock()
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        # A single worker keeps flushes in order.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._flush = None
+        self.sessions = 0
+
+    async def handle(self, reader, writer):
+        session = Session()
+        self.sessions += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.dispatch(session, line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def dispatch(self, session, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request['op']
+            mode = OPERATIONS[op]
+            args = request.get('args') or {}
+            handler = getattr(self, f"op_{op}")
+            if request.get('token'):
+                session.token = request['token']
+            session.user = self.dms.authenticator.validate(session.token) if session.token else None
+            if mode == 'read':
+                async with self.lock.reading():
+                    result = handler(session, **args)
+            else:
+                async with self.lock.writing():
+                    result = self._as_user(session, handler, args)
+                if self.deferred:
+                    # Answer once the change is on disk, without holding up
+                    # other sessions while it gets there.
+                    await self._flushed()
+        except KeyError as e:
+            return {'id': request_id, 'error': f"Unknown operation or missing field: {e}"}
+        except (ValueError, TypeError, AttributeError) as e:
+            return {'id': request_id, 'error': str(e)}
+        except OSError as e:
+            return {'id': request_id, 'error': f"Storage error: {e}"}
+        return {'id': request_id, 'result': result}
+
+    def _as_user(self, session, handler, args):
+        # The system still checks roles through current_user; writes hold
+        # the writer lock, so swapping it in cannot leak into another session.
+        self.dms.current_user = session.user
+        try:
+            return handler(session, **args)
+        finally:
+            self.dms.current_user = None
+
+    def _flushed(self):
+        # Writes that land while a flush is pending share it.
+        if self._flush is None:
+            self._flush = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().create_task(self._flush_soon(self._flush))
+        return asyncio.shield(self._flush)
+
+    async def _flush_soon(self, future):
+        await asyncio.sleep(self.flush_interval)
+        self._flush = None
+        try:
+            # Flushing first catches up with other processes, which can
+            # rebuild the very records and indexes handlers read, so nothing
+            # else runs meanwhile. The loop itself stays free.
+            async with self.lock.writing():
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.dms.data_manager.flush)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+    async def sync_forever(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            async with self.lock.writing():
+                self.dms.sync()
+
+    def close(self):
+        self.executor.shutdown()
+        self.dms.close()
+
+    def _require(self, session, roles=None):
+        if session.user is None:
+            raise ValueError("Login required")
+        if roles and not isinstance(session.user, roles):
+            raise ValueError("Permission denied")
+        return session.user
+
+    def _student(self, student_id):
+        student = self.dms.search_student(student_id)
+        if student is None:
+            raise ValueError(f"No student with ID {student_id}")
+        return student
+
+    def _view(self, user):
+        if isinstance(user, Student):
+            # Loads rooms on first use so the view can include the room.
+            self.dms.get_student_room(user)
+        return user_view(user)
+
+    def op_login(self, session, username, password):
+        token = self.dms.authenticator.create_session(username, password)
+        if token is None:
+            raise ValueError("Invalid credentials")
+        session.token = token
+        session.user = self.dms.authenticator.validate(token)
+        return {'token': token, 'user': self._view(session.user)}
+
+    def op_logout(self, session):
+        revoked = self.dms.authenticator.logout(session.token) if session.token else False
+        session.token = None
+        session.user = None
+        return revoked
+
+    def op_whoami(self, session):
+        return self._view(self._require(session))
+
+    def op_register(self, session, username, password, role="student", **fields):
+        # Anyone may sign up as a student; staff accounts are created by
+        # staff, and only an admin may create another admin.
+        if role == "admin":
+            self._require(session, Admin)
+        elif role != "student":
+            self._require(session, STAFF)
+        return self._view(self.dms.register_user(username, password, role, **fields))
+
+    def op_change_password(self, session, old_password, new_password):
+        user = self._require(session)
+        if not self.dms.change_password(old_password, new_password):
+            raise ValueError("Current password is incorrect")
+        # Every session of the user was revoked, this one included.
+        session.token = self.dms.authenticator.sessions.create(user)
+        return {'token': session.token}
+
+    def op_edit_profile(self, session, contact_info=None, gender=None, department=None,
+                        year=None):
+        self._require(session, Student)
+        return self.dms.edit_profile(contact_info, gender, department, year)
+
+    def op_rooms(self, session):
+        self._require(session, STAFF)
+        return [room_view(room) for room in self.dms.rooms]
+
+    def op_vacant_rooms(self, session):
+        self._require(session, STAFF)
+        return [room_view(room) for room in self.dms.search_vacant_rooms()]
+
+    def op_occupancy(self, session):
+        self._require(session, STAFF)
+        return self.dms.get_occupancy_stats()
+
+    def op_search_student(self, session, student_id):
+        self._require(session, STAFF)
+        return self._view(self._student(student_id))
+
+    def op_allocate_room(self, session, student_id, room_number):
+        self._require(session, STAFF)
+        room = self.dms.get_room(room_number)
+        if room is None:
+            raise ValueError(f"No room {room_number}")
+        return self.dms.allocate_room(self._student(student_id), room)
+
+    def op_allocate_unallocated(self, session):
+        self._require(session, STAFF)
+        result = self.dms.allocate_rooms_bulk(self.dms.unallocated_students())
+        return {'placed': len(result.placed), 'unplaced': len(result.unplaced)}
+
+    def op_create_maintenance_request(self, session, description):
+        self._require(session, Student)
+        return self.dms.create_maintenance_request(description).to_record()
+
+    def op_my_maintenance_requests(self, session, offset=0, limit=None):
+        student = self._require(session, Student)
+        return [request.to_record() for request in
+                self.dms.get_student_maintenance_requests(student, offset, limit)]
+
+    def op_maintenance_requests(self, session, status=None, offset=0, limit=None):
+        self._require(session, STAFF)
+        return [request.to_record() for request in
+                self.dms.list_maintenance_requests(status, offset, limit)]
+
+    def op_update_maintenance_request(self, session, request_id, status):
+        self._require(session, STAFF)
+        return self.dms.update_maintenance_request(request_id, status)
+
+    def op_search_maintenance_requests(self, session, query, status=None, since=None,
+                                       until=None, prefix=True, limit=20):
+        self._require(session, STAFF)
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+        return [request.to_record() for request in
+                self.dms.search_maintenance_requests(query, status, since, until, prefix, limit)]
+
+    def op_create_payment(self, session, student_id, amount, due_date):
+        self._require(session, STAFF)
+        payment = self.dms.create_payment(self._student(student_id), float(amount),
+                                          datetime.fromisoformat(due_date))
+        return payment.to_record()
+
+    def op_my_payments(self, session):
+        student = self._require(session, Student)
+        return [payment.to_record() for payment in self.dms.get_student_payments(student)]
+
+    def op_student_payments(self, session, student_id):
+        self._require(session, STAFF)
+        return [payment.to_record() for payment in
+                self.dms.get_student_payments(self._student(student_id))]
+
+    def op_payment_due(self, session):
+        student = self._require(session, Student)
+        payment = self.dms.check_payment_due(student)
+        return payment.to_record() if payment else None
+
+    def op_overdue_payments(self, session, as_of=None, limit=None):
+        self._require(session, STAFF)
+        overdue = self.dms.sweep_overdue(datetime.fromisoformat(as_of) if as_of else None)
+        return [payment.to_record() for payment in overdue[:limit]]
+
+    def op_mark_payment_paid(self, session, payment_id):
+        self._require(session, STAFF)
+        return self.dms.mark_payment_paid(payment_id)
+
+    def op_finance_report(self, session, as_of=None):
+        self._require(session, STAFF)
+        return self.dms.get_finance_report(datetime.fromisoformat(as_of) if as_of else None)
+
+async def serve(server, host=None, port=None, path=None):
+    if path:
+        listener = await asyncio.start_unix_server(server.handle, path=path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    for sock in listener.sockets:
+        print(f"Serving on {sock.getsockname()}")
+    sync = asyncio.get_running_loop().create_task(server.sync_forever())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        sync.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dormitory system to many clients "
+                                                 "over JSON lines.")
+    parser.add_argument("--data", default="dormitory_data.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--journal", action="store_true")
+    parser.add_argument("--flush-interval", type=float, default=0.005,
+                        help="seconds to gather writes into one flush")
+    args = parser.parse_args()
+    server = DormitoryServer(args.data, args.journal, args.flush_interval)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,85 @@
+class StorageBackend:
+    INDEX_KEYS = {
+        'users': ('username', 'student_id'),
+        'rooms': ('room_number',),
+        'maintenance_requests': ('id',),
+        'payments': ('id',),
+    }
+
+    def load_data(self):
+        raise NotImplementedError
+
+    def save_data(self):
+        raise NotImplementedError
+
+    def transaction(self):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def refresh(self):
+        # Records other processes have written since the last call, or None
+        # when everything read so far may be stale.
+        return []
+
+    def close(self):
+        self.flush()
+
+    def get_records(self, category):
+        raise NotImplementedError
+
+    def iter_records(self, category, chunk_size=1000):
+        # Lists of at most chunk_size records, for walking a collection
+        # without building a copy of it.
+        records = self.get_records(category)
+        for start in range(0, len(records), chunk_size):
+            yield records[start:start + chunk_size]
+
+    def find(self, category, item_id, key=None):
+        raise NotImplementedError
+
+    def get_student_records(self, category, student_id):
+        return [item for item in self.get_records(category) if item.get('student') == student_id]
+
+    def update_data(self, category, item_id, updates, key=None):
+        raise NotImplementedError
+
+    def update_many(self, changes):
+        raise NotImplementedError
+
+    def _add(self, category, items):
+        raise NotImplementedError
+
+    def add_user(self, user):
+        self._add('users', [user.to_record()])
+
+    def add_users(self, users):
+        self._add('users', [user.to_record() for user in users])
+
+    def get_users(self):
+        return self.get_records('users')
+
+    def add_room(self, room):
+        self._add('rooms', [room.to_record()])
+
+    def get_rooms(self):
+        return self.get_records('rooms')
+
+    def add_maintenance_request(self, request):
+        self._add('maintenance_requests', [request.to_record()])
+
+    def get_maintenance_requests(self):
+        return self.get_records('maintenance_requests')
+
+    def get_student_maintenance_requests(self, student_id):
+        return self.get_student_records('maintenance_requests', student_id)
+
+    def add_payment(self, payment):
+        self._add('payments', [payment.to_record()])
+
+    def get_payments(self):
+        return self.get_records('payments')
+
+    def get_student_payments(self, student_id):
+        return self.get_student_records('payments', student_id)
@@ -0,0 +1,191 @@
+import json
+import marshal
+import mmap
+import struct
+import sys
+from itertools import repeat
+from models.compact import to_isoformat, to_micros
+from storage.data_manager import DataManager
+
+# Layout (little-endian):
+#   header   magic, format version, marshal version, section count, generation
+#   sections one entry per collection: name, offset, length, record count
+#   payload  one marshal blob per collection, at the offset in its entry
+#
+# Each blob is (fields, columns, masks): the field names, one list of values
+# per field, and a bitmask of the fields present for each record that does
+# not have all of them. Timestamps are stored as integer microseconds and
+# come back out as ISO 8601 strings, as from the JSON file.
+MAGIC = b'DMSB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHQ')
+SECTION = struct.Struct('<32sQQI')
+COLLECTIONS = ('users', 'rooms', 'maintenance_requests', 'payments')
+TIMESTAMP_FIELDS = {'maintenance_requests': ('created_at',), 'payments': ('due_date',)}
+
+def encode_collection(name, records):
+    fields = []
+    for record in records:
+        for field in record:
+            if field not in fields:
+                fields.append(field)
+    timestamps = TIMESTAMP_FIELDS.get(name, ())
+    columns = []
+    for field in fields:
+        column = [record.get(field) for record in records]
+        if field in timestamps:
+            column = [to_micros(value) if value is not None else None for value in column]
+        columns.append(column)
+    # Only records missing some fields get an entry, keyed by row.
+    masks = {row: sum(1 << position for position, field in enumerate(fields) if field in record)
+             for row, record in enumerate(records) if len(record) != len(fields)}
+    return marshal.dumps((tuple(fields), columns, masks))
+
+def decode_collection(payload, timestamps=()):
+    fields, columns, masks = marshal.loads(payload)
+    for position, field in enumerate(fields):
+        if field in timestamps:
+            columns[position] = [to_isoformat(value) for value in columns[position]]
+    records = list(map(dict, map(zip, repeat(fields), zip(*columns))))
+    for row, mask in masks.items():
+        record = records[row]
+        for position, field in enumerate(fields):
+            if not mask >> position & 1:
+                del record[field]
+    return records
+
+def encode_snapshot(data, generation=0):
+    blobs = [(name, encode_collection(name, data.get(name, []))) for name in COLLECTIONS]
+    offset = HEADER.size + SECTION.size * len(blobs)
+    parts = [HEADER.pack(MAGIC, VERSION, marshal.version, len(blobs), generation)]
+    for name, blob in blobs:
+        parts.append(SECTION.pack(name.encode(), offset, len(blob), len(data.get(name, []))))
+        offset += len(blob)
+    parts.extend(blob for _, blob in blobs)
+    return b''.join(parts)
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, marshal_version, count, self.generation = \
+            HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary snapshot")
+        if version != VERSION or marshal_version != marshal.version:
+            raise ValueError(f"{path} was written by an incompatible version; "
+                             f"convert it through JSON")
+        self.sections = {}
+        for position in range(count):
+            name, offset, length, records = SECTION.unpack_from(
+                self.buffer, HEADER.size + position * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode()] = (offset, length, records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def count(self, name):
+        return self.sections[name][2]
+
+    def read(self, name):
+        # Only this collection's bytes are touched; the rest of the mapping
+        # is never paged in.
+        return decode_collection(self.payload(name), TIMESTAMP_FIELDS.get(name, ()))
+
+    def payload(self, name):
+        offset, length, _ = self.sections[name]
+        return self.buffer[offset:offset + length]
+
+    def read_all(self):
+        data = {name: self.read(name) for name in self.sections}
+        data['generation'] = self.generation
+        return data
+
+class SnapshotSections(dict):
+    # The collections of a snapshot, each decoded the first time it is
+    # asked for; opening a store only pays for the collections it uses.
+    # Anything that walks the whole mapping decodes the rest first.
+    def __init__(self, reader):
+        super().__init__(generation=reader.generation)
+        self.payloads = {name: reader.payload(name) for name in reader.sections}
+
+    def __missing__(self, name):
+        if name not in self.payloads:
+            raise KeyError(name)
+        records = self[name] = decode_collection(self.payloads.pop(name),
+                                                 TIMESTAMP_FIELDS.get(name, ()))
+        return records
+
+    def __contains__(self, name):
+        return name in self.payloads or super().__contains__(name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def decode_all(self):
+        for name in list(self.payloads):
+            self[name]
+
+    def __iter__(self):
+        self.decode_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self.decode_all()
+        return super().__len__()
+
+    def keys(self):
+        self.decode_all()
+        return super().keys()
+
+    def values(self):
+        self.decode_all()
+        return super().values()
+
+    def items(self):
+        self.decode_all()
+        return super().items()
+
+class BinarySnapshotDataManager(DataManager):
+    SNAPSHOT_MODE = 'wb'
+
+    def _read_snapshot(self):
+        with SnapshotReader(self.file_path) as reader:
+            return SnapshotSections(reader)
+
+    def _serialize(self, snapshot):
+        snapshot = dict(snapshot)
+        return encode_snapshot(snapshot, snapshot.pop('generation', 0))
+
+    def _dump(self, snapshot, file):
+        file.write(self._serialize(snapshot))
+
+def json_to_binary(json_path, binary_path):
+    source = DataManager(json_path)
+    with open(binary_path, 'wb') as file:
+        file.write(encode_snapshot(source.data))
+    return {name: len(source.get_records(name)) for name in COLLECTIONS}
+
+def binary_to_json(binary_path, json_path):
+    with SnapshotReader(binary_path) as reader:
+        data = {name: reader.read(name) for name in COLLECTIONS if name in reader.sections}
+    with open(json_path, 'w') as file:
+        json.dump(data, file, indent=2)
+    return {name: len(records) for name, records in data.items()}
+
+if __name__ == "__main__":
+    converters = {'to-binary': json_to_binary, 'to-json': binary_to_json}
+    if len(sys.argv) != 4 or sys.argv[1] not in converters:
+        print("Usage: python -m storage.binary_snapshot to-binary <data.json> <data.dmsb>")
+        print("       python -m storage.binary_snapshot to-json <data.dmsb> <data.json>")
+        sys.exit(1)
+    for name, count in converters[sys.argv[1]](sys.argv[2], sys.argv[3]).items():
+        print(f"{name}: {count}")
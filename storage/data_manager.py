@@ -1,65 +1,482 @@
+import atexit
 import json
 import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager, suppress
+from metrics.registry import METRICS
+from storage.backend import StorageBackend
+from storage.file_lock import FileLock
 
-class DataManager:
-    def __init__(self, file_path):
+MISSING = object()
+LEGACY_PAYMENTS = uuid.uuid5(uuid.NAMESPACE_URL, 'dormitory/payments')
+
+class CategoryIndexes(dict):
+    # Each collection is indexed the first time it is looked up in, so one
+    # that is never used is never walked.
+    def __init__(self, data, index_keys):
+        super().__init__()
+        self.data = data
+        self.index_keys = index_keys
+
+    def __missing__(self, category):
+        indexes = self[category] = {key: {} for key in self.index_keys[category]}
+        for item in self.data.get(category, []):
+            for key, index in indexes.items():
+                value = item.get(key)
+                if value is not None:
+                    index[value] = item
+        return indexes
+
+class DataManager(StorageBackend):
+    SNAPSHOT_MODE = 'w'
+    COMPACT_RECORDS = 10000
+    COMPACT_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, file_path, journal=False, compact_records=COMPACT_RECORDS,
+                 compact_bytes=COMPACT_BYTES, group_commit=None, manual_flush=False):
         self.file_path = file_path
-        self.data = self.load_data()
+        self.journal = journal
+        self.journal_path = file_path + '.journal'
+        self.compact_records = compact_records
+        self.compact_bytes = compact_bytes
+        self.generation = 0
+        self.journal_records = 0
+        self.journal_bytes = 0
+        self.indexes = {}
+        self.student_indexes = {}
+        # Seconds to coalesce writes for; None writes on every commit.
+        self.group_commit = group_commit
+        # Buffer every write until the caller flushes, e.g. from a worker
+        # thread so the caller never waits on the disk.
+        self.manual_flush = manual_flush
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._pending = []
+        self._undo = []
+        self._unflushed = []
+        self._dirty = False
+        self._flush_timer = None
+        # Other processes may share the file: every write happens under the
+        # file lock, after catching up with whatever they wrote meanwhile.
+        self.file_lock = FileLock(file_path + '.lock')
+        self._snapshot_signature = None
+        # Records applied from other processes since the last refresh(), or
+        # None when the whole file had to be reloaded.
+        self._changes = []
+        if group_commit or manual_flush:
+            atexit.register(self.flush)
+        with self.file_lock:
+            self.data = self.load_data()
+            if self.journal_records and not self.journal:
+                # A journal left over from a journaled session must be folded
+                # in before full-file saves take over, or it would be
+                # replayed twice.
+                self.compact()
 
     def load_data(self):
-        if os.path.exists(self.file_path):
-            with open(self.file_path, 'r') as file:
-                return json.load(file)
-        return {"users": [], "rooms": [], "maintenance_requests": [], "payments": []}
+        if not METRICS.enabled:
+            return self._load_data()
+        start = time.perf_counter()
+        data = self._load_data()
+        METRICS.increment('data_manager.load_data.count')
+        METRICS.observe('data_manager.load_data', time.perf_counter() - start)
+        return data
+
+    def _load_data(self):
+        data = {"users": [], "rooms": [], "maintenance_requests": [], "payments": []}
+        self._snapshot_signature = self._stat_snapshot()
+        if self._snapshot_signature is not None:
+            data = self._read_snapshot()
+        self.generation = data.pop('generation', 0)
+        self.build_indexes(data)
+        self.journal_records = 0
+        self.journal_bytes = 0
+        if os.path.exists(self.journal_path):
+            self._replay_journal(data)
+        return data
+
+    def _stat_snapshot(self):
+        # os.replace gives every save a new inode, so this changes whenever
+        # any process rewrites the snapshot.
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_snapshot(self):
+        with open(self.file_path, 'r') as file:
+            data = json.load(file)
+        for position, payment_data in enumerate(data.get('payments', [])):
+            # Payments saved before they had ids still need a primary key.
+            # It has to come out the same on every load and in every
+            # process, or journaled updates to the payment would be lost.
+            if 'id' not in payment_data:
+                content = json.dumps(payment_data, sort_keys=True)
+                payment_data['id'] = str(uuid.uuid5(LEGACY_PAYMENTS, f"{position}:{content}"))
+        return data
+
+    def _serialize(self, snapshot):
+        return json.dumps(snapshot, indent=2)
+
+    def _dump(self, snapshot, file):
+        json.dump(snapshot, file, indent=2)
+
+    def _replay_journal(self, data, changes=None):
+        with open(self.journal_path, 'rb') as file:
+            header = file.readline()
+            try:
+                generation = json.loads(header)['generation']
+            except (ValueError, KeyError, TypeError):
+                return
+            # The snapshot was compacted after this journal was written, so
+            # everything in it is already part of the snapshot.
+            if generation != self.generation:
+                return
+            self.journal_bytes = len(header)
+            self._apply_journal(file, data, changes)
+
+    def _apply_journal(self, file, data, changes=None):
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Partial record from an interrupted append.
+                break
+            if not line.endswith(b'\n'):
+                # Or one still being written.
+                break
+            self._apply(data, record)
+            if changes is not None:
+                changes.append(record)
+            self.journal_records += 1
+            self.journal_bytes += len(line)
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock, self.file_lock:
+            if self.file_lock.depth == 1:
+                self._catch_up()
+            yield
+
+    def _catch_up(self):
+        if self._stat_snapshot() != self._snapshot_signature and not self._adopt_compaction():
+            self._reload()
+            return
+        if not os.path.exists(self.journal_path):
+            return
+        if self.journal_bytes:
+            self._read_journal_tail()
+        else:
+            # A journal another process has just started.
+            self._replay_journal(self.data, self._changes)
+
+    def _adopt_compaction(self):
+        # A peer that compacts is always caught up first, so if it started
+        # from exactly where we are, its snapshot holds nothing we lack.
+        try:
+            with open(self.journal_path, 'rb') as file:
+                line = file.readline()
+            header = json.loads(line)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(header, dict) or header.get('base') != [self.generation,
+                                                                  self.journal_bytes]:
+            return False
+        self.generation = header['generation']
+        self.journal_bytes = len(line)
+        self.journal_records = 0
+        self._snapshot_signature = self._stat_snapshot()
+        return True
+
+    def _read_journal_tail(self):
+        with open(self.journal_path, 'rb') as file:
+            file.seek(self.journal_bytes)
+            self._apply_journal(file, self.data, self._changes)
+
+    def _reload(self):
+        self.data = self.load_data()
+        # Writes still waiting for a group commit belong on top of the
+        # fresh copy.
+        for record in self._unflushed:
+            self._apply(self.data, record)
+        self._changes = None
+
+    def refresh(self):
+        with self._exclusive():
+            changes = self._changes
+            self._changes = []
+        return changes
+
+    def build_indexes(self, data):
+        self.indexes = CategoryIndexes(data, self.INDEX_KEYS)
+        self.student_indexes = {}
+
+    def _index(self, category, item):
+        for key, index in self.indexes[category].items():
+            value = item.get(key)
+            if value is not None:
+                index[value] = item
+
+    def get_student_records(self, category, student_id):
+        index = self.student_indexes.get(category)
+        if index is None:
+            index = self.student_indexes[category] = {}
+            for item in self.data[category]:
+                index.setdefault(item.get('student'), []).append(item)
+        return index.get(student_id, [])
+
+    def find(self, category, item_id, key=None):
+        keys = (key,) if key else self.INDEX_KEYS[category]
+        for key in keys:
+            item = self.indexes[category][key].get(item_id)
+            if item is not None:
+                return item
+        return None
+
+    def _apply(self, data, record):
+        category = record['category']
+        if record['op'] == 'add':
+            if self._transaction_depth:
+                self._undo.append(('add', category, record['item'], None))
+            data[category].append(record['item'])
+            self._index(category, record['item'])
+            student_index = self.student_indexes.get(category)
+            if student_index is not None:
+                student_index.setdefault(record['item'].get('student'), []).append(record['item'])
+            return True
+        if record['op'] == 'update':
+            item = self.find(category, record['id'], record.get('key'))
+            if item is None:
+                return False
+            if self._transaction_depth:
+                previous = {key: item.get(key, MISSING) for key in record['updates']}
+                self._undo.append(('update', category, item, previous))
+            self._unindex(category, item, record['updates'])
+            item.update(record['updates'])
+            self._index(category, item)
+            return True
+        return False
+
+    def _unindex(self, category, item, keys=None):
+        for key, index in self.indexes[category].items():
+            if (keys is None or key in keys) and index.get(item.get(key)) is item:
+                del index[item[key]]
+
+    def _rollback(self, mark):
+        while len(self._undo) > mark:
+            op, category, item, previous = self._undo.pop()
+            if op == 'add':
+                self.data[category].pop()
+                self._unindex(category, item)
+                student_index = self.student_indexes.get(category)
+                if student_index is not None:
+                    student_index[item.get('student')].pop()
+            else:
+                self._unindex(category, item, previous)
+                for key, value in previous.items():
+                    if value is MISSING:
+                        item.pop(key, None)
+                    else:
+                        item[key] = value
+                self._index(category, item)
+
+    @contextmanager
+    def transaction(self):
+        with self._exclusive():
+            undo_mark = len(self._undo)
+            pending_mark = len(self._pending)
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._rollback(undo_mark)
+                del self._pending[pending_mark:]
+                raise
+            finally:
+                self._transaction_depth -= 1
+            if not self._transaction_depth:
+                records = self._pending
+                self._pending = []
+                self._undo = []
+                if records:
+                    self._write(records)
+
+    def _replace_file(self, path, write, mode='w'):
+        # Write next to the target, fsync, then rename over it, so a crash
+        # leaves either the old file or the new one, never a truncated one.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode) as file:
+                write(file)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(path):
+                os.chmod(temp_path, os.stat(path).st_mode)
+            else:
+                # mkstemp creates files private to the owner; a new file
+                # should get the usual umask-based permissions instead.
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(temp_path, 0o666 & ~umask)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
 
     def save_data(self):
-        with open(self.file_path, 'w') as file:
-            json.dump(self.data, file, indent=2)
-
-    def add_user(self, user):
-        user_data = user.__dict__.copy()
-        user_data['role'] = user.__class__.__name__.lower()
-        if 'room' in user_data:
-            user_data['room'] = user_data['room'].room_number if user_data['room'] else None
-        self.data['users'].append(user_data)
-        self.save_data()
-
-    def get_users(self):
-        return self.data['users']
-
-    def add_room(self, room):
-        room_data = room.__dict__.copy()
-        room_data['occupants'] = [occupant.student_id for occupant in room.occupants]
-        self.data['rooms'].append(room_data)
-        self.save_data()
-
-    def get_rooms(self):
-        return self.data['rooms']
-
-    def add_maintenance_request(self, request):
-        request_data = request.__dict__.copy()
-        request_data['student'] = request.student.student_id
-        request_data['created_at'] = request.created_at.isoformat()
-        self.data['maintenance_requests'].append(request_data)
-        self.save_data()
-
-    def get_maintenance_requests(self):
-        return self.data['maintenance_requests']
-
-    def add_payment(self, payment):
-        payment_data = payment.__dict__.copy()
-        payment_data['student'] = payment.student.student_id
-        payment_data['due_date'] = payment.due_date.isoformat()
-        self.data['payments'].append(payment_data)
-        self.save_data()
-
-    def get_payments(self):
-        return self.data['payments']
-
-    def update_data(self, category, item_id, updates):
-        for item in self.data[category]:
-            if item['id'] == item_id:
-                item.update(updates)
+        with self._exclusive():
+            self._save_snapshot()
+            self._snapshot_signature = self._stat_snapshot()
+
+    def _save_snapshot(self):
+        snapshot = dict(self.data)
+        if self.journal or self.generation:
+            snapshot = {'generation': self.generation, **snapshot}
+        if not METRICS.enabled:
+            self._replace_file(self.file_path, lambda file: self._dump(snapshot, file),
+                               self.SNAPSHOT_MODE)
+            return
+        start = time.perf_counter()
+        text = self._serialize(snapshot)
+        serialized = time.perf_counter()
+        self._replace_file(self.file_path, lambda file: file.write(text), self.SNAPSHOT_MODE)
+        METRICS.increment('data_manager.save_data.count')
+        METRICS.increment('data_manager.save_data.bytes_written', len(text))
+        METRICS.observe('data_manager.save_data.serialize', serialized - start)
+        METRICS.observe('data_manager.save_data.write', time.perf_counter() - serialized)
+
+    def compact(self):
+        with self._exclusive():
+            base = [self.generation, self.journal_bytes]
+            self.generation += 1
+            self.save_data()
+            if self.journal:
+                self._start_journal(base)
+            elif os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+                self.journal_bytes = 0
+                self.journal_records = 0
+
+    def _start_journal(self, base=None):
+        header = {'generation': self.generation}
+        if base:
+            header['base'] = base
+        text = json.dumps(header) + '\n'
+        self._replace_file(self.journal_path, lambda file: file.write(text))
+        self.journal_bytes = len(text)
+        self.journal_records = 0
+
+    def _commit(self, records):
+        if self._transaction_depth:
+            self._pending.extend(records)
+            return
+        self._write(records)
+
+    def _write(self, records):
+        if not self.group_commit and not self.manual_flush:
+            self._persist(records)
+            self._compact_if_due()
+            return
+        self._unflushed.extend(records)
+        self._dirty = True
+        if self.group_commit and self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.group_commit, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._dirty:
+                with self._exclusive():
+                    # Only let go of the buffer once it is on disk, so a
+                    # failed write is retried by the next flush.
+                    self._persist(self._unflushed)
+                    self._unflushed = []
+                    self._dirty = False
+                    self._compact_if_due()
+
+    def close(self):
+        self.flush()
+
+    def _persist(self, records):
+        if not self.journal_bytes or not os.path.exists(self.journal_path):
+            if not self.journal:
                 self.save_data()
+                return
+            # No journal for the current snapshot yet (or only a stale one
+            # already folded into it): start one rather than rewrite the
+            # snapshot, so other processes only have these records to read.
+            self._start_journal()
+        elif not self.journal:
+            # Another process is journaling; fold its journal in rather than
+            # leave it to be replayed over this snapshot.
+            self.compact()
+            return
+        text = ''.join(json.dumps(record) + '\n' for record in records)
+        if os.path.getsize(self.journal_path) > self.journal_bytes:
+            # Drop the torn tail of an interrupted append so this one starts
+            # on a line of its own.
+            os.truncate(self.journal_path, self.journal_bytes)
+        try:
+            with open(self.journal_path, 'a') as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+                self.journal_bytes = file.tell()
+        except BaseException:
+            # Take back whatever made it into the file; otherwise catching
+            # up before the retry would read it as another process's write.
+            with suppress(OSError):
+                os.truncate(self.journal_path, self.journal_bytes)
+            raise
+        if METRICS.enabled:
+            METRICS.increment('data_manager.journal.appends')
+            METRICS.increment('data_manager.journal.records', len(records))
+            METRICS.increment('data_manager.journal.bytes_written', len(text))
+        self.journal_records += len(records)
+
+    def _compact_if_due(self):
+        if (self.journal_records >= self.compact_records
+                or self.journal_bytes >= self.compact_bytes):
+            self.compact()
+
+    def _add(self, category, items):
+        records = [{'op': 'add', 'category': category, 'item': item} for item in items]
+        with self._exclusive():
+            for record in records:
+                self._apply(self.data, record)
+            self._commit(records)
+
+    def get_records(self, category):
+        return self.data[category]
+
+    def _update_record(self, category, item_id, updates, key=None):
+        record = {'op': 'update', 'category': category, 'id': item_id, 'updates': updates}
+        if key:
+            record['key'] = key
+        return record
+
+    def update_data(self, category, item_id, updates, key=None):
+        record = self._update_record(category, item_id, updates, key)
+        with self._exclusive():
+            if self._apply(self.data, record):
+                self._commit([record])
                 return True
-        return False
\ No newline at end of file
+        return False
+
+    def update_many(self, changes):
+        records = [self._update_record(*change) for change in changes]
+        with self._exclusive():
+            applied = [record for record in records if self._apply(self.data, record)]
+            if applied:
+                self._commit(applied)
+        return len(applied)
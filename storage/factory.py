@@ -0,0 +1,25 @@
+import os
+from storage.binary_snapshot import BinarySnapshotDataManager
+from storage.data_manager import DataManager
+from storage.sqlite_manager import SQLiteDataManager
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+BINARY_EXTENSIONS = ('.dmsb',)
+
+def backend_for_path(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return 'sqlite'
+    if extension in BINARY_EXTENSIONS:
+        return 'binary'
+    return 'json'
+
+def create_data_manager(file_path, backend=None, **options):
+    backend = backend or backend_for_path(file_path)
+    if backend == 'json':
+        return DataManager(file_path, **options)
+    if backend == 'binary':
+        return BinarySnapshotDataManager(file_path, **options)
+    if backend == 'sqlite':
+        return SQLiteDataManager(file_path, **options)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,67 @@
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    # Exclusive lock on a sidecar file, shared by every process that opens
+    # the same data file. Re-entrant within a process so nested writes
+    # (a compaction inside a save) don't deadlock on themselves.
+    def __init__(self, path):
+        self.path = path
+        self.depth = 0
+        self._file = None
+        self._lock = threading.RLock()
+
+    def acquire(self):
+        self._lock.acquire()
+        if self.depth == 0:
+            try:
+                self._file = open(self.path, 'a+b')
+                self._lock_file(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self._unlock_file(self._file)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def _lock_file(self, file):
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            return
+        file.seek(0)
+        while True:
+            try:
+                # LK_LOCK gives up after ten one-second retries.
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.1)
+
+    def _unlock_file(self, file):
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            return
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,204 @@
+import json
+import sqlite3
+import sys
+from contextlib import contextmanager
+from storage.backend import StorageBackend
+from storage.data_manager import DataManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    student_id TEXT UNIQUE,
+    contact_info TEXT,
+    gender TEXT,
+    department TEXT,
+    year TEXT,
+    room TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_room ON users (room);
+
+CREATE TABLE IF NOT EXISTS rooms (
+    room_number TEXT PRIMARY KEY,
+    capacity INTEGER NOT NULL,
+    occupants TEXT NOT NULL DEFAULT '[]'
+);
+
+CREATE TABLE IF NOT EXISTS maintenance_requests (
+    id TEXT PRIMARY KEY,
+    student TEXT,
+    description TEXT,
+    status TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requests_student ON maintenance_requests (student);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON maintenance_requests (status, created_at);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id TEXT PRIMARY KEY,
+    student TEXT,
+    amount REAL,
+    due_date TEXT,
+    paid INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_payments_student ON payments (student);
+CREATE INDEX IF NOT EXISTS idx_payments_due ON payments (paid, due_date);
+"""
+
+COLUMNS = {
+    'users': ('username', 'password', 'role', 'student_id', 'contact_info', 'gender',
+              'department', 'year', 'room'),
+    'rooms': ('room_number', 'capacity', 'occupants'),
+    'maintenance_requests': ('id', 'student', 'description', 'status', 'created_at'),
+    'payments': ('id', 'student', 'amount', 'due_date', 'paid'),
+}
+JSON_COLUMNS = {'occupants'}
+BOOL_COLUMNS = {'paid'}
+
+class SQLiteDataManager(StorageBackend):
+    def __init__(self, file_path, journal=False, group_commit=None, manual_flush=False):
+        # The file backends' write options have nothing to do here: the WAL
+        # is SQLite's journal, and every transaction commits on release.
+        self.file_path = file_path
+        self.conn = sqlite3.connect(file_path)
+        self.conn.row_factory = sqlite3.Row
+        self._savepoints = 0
+        self.load_data()
+        self._data_version = self._read_data_version()
+
+    def load_data(self):
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def save_data(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        # SQLite already serialises writers across processes; data_version
+        # only moves when another connection commits.
+        version = self._read_data_version()
+        if version == self._data_version:
+            return []
+        self._data_version = version
+        return None
+
+    @contextmanager
+    def transaction(self):
+        # Savepoints nest; releasing the outermost one commits.
+        self._savepoints += 1
+        name = f"sp{self._savepoints}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            self.conn.execute(f"RELEASE {name}")
+        finally:
+            self._savepoints -= 1
+
+    def _to_row(self, category, item):
+        row = []
+        for column in COLUMNS[category]:
+            value = item.get(column)
+            if column in JSON_COLUMNS:
+                value = json.dumps(value or [])
+            row.append(value)
+        return row
+
+    def _from_row(self, category, row):
+        item = dict(row)
+        for column in JSON_COLUMNS.intersection(item):
+            item[column] = json.loads(item[column])
+        for column in BOOL_COLUMNS.intersection(item):
+            item[column] = bool(item[column])
+        if category == 'users' and item['role'] != 'student':
+            item = {'username': item['username'], 'password': item['password'],
+                    'role': item['role']}
+        return item
+
+    def _insert(self, category, items, replace=False):
+        columns = COLUMNS[category]
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        self.conn.executemany(
+            f"{verb} INTO {category} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            (self._to_row(category, item) for item in items))
+
+    def _add(self, category, items):
+        with self.transaction():
+            self._insert(category, items)
+
+    def get_records(self, category):
+        cursor = self.conn.execute(f"SELECT * FROM {category}")
+        return [self._from_row(category, row) for row in cursor]
+
+    def iter_records(self, category, chunk_size=1000):
+        cursor = self.conn.execute(f"SELECT * FROM {category}")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [self._from_row(category, row) for row in rows]
+
+    def get_student_records(self, category, student_id):
+        cursor = self.conn.execute(f"SELECT * FROM {category} WHERE student = ?", (student_id,))
+        return [self._from_row(category, row) for row in cursor]
+
+    def find(self, category, item_id, key=None):
+        for key in (key,) if key else self.INDEX_KEYS[category]:
+            row = self.conn.execute(f"SELECT * FROM {category} WHERE {key} = ?",
+                                    (item_id,)).fetchone()
+            if row is not None:
+                return self._from_row(category, row)
+        return None
+
+    def _update(self, category, item_id, updates, key=None):
+        columns = [column for column in COLUMNS[category] if column in updates]
+        if not columns:
+            return self.find(category, item_id, key) is not None
+        values = self._to_row(category, updates)
+        values = [values[COLUMNS[category].index(column)] for column in columns]
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        for key in (key,) if key else self.INDEX_KEYS[category]:
+            cursor = self.conn.execute(
+                f"UPDATE {category} SET {assignments} WHERE {key} = ?",
+                values + [item_id])
+            if cursor.rowcount:
+                return True
+        return False
+
+    def update_data(self, category, item_id, updates, key=None):
+        with self.transaction():
+            return self._update(category, item_id, updates, key)
+
+    def update_many(self, changes):
+        with self.transaction():
+            return sum(1 for change in changes if self._update(*change))
+
+def migrate_json_to_sqlite(json_path, sqlite_path):
+    source = DataManager(json_path)
+    target = SQLiteDataManager(sqlite_path)
+    with target.transaction():
+        for category in COLUMNS:
+            target._insert(category, source.get_records(category), replace=True)
+    counts = {category: len(source.get_records(category)) for category in COLUMNS}
+    target.close()
+    return counts
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m storage.sqlite_manager <data.json> <data.db>")
+        sys.exit(1)
+    for category, count in migrate_json_to_sqlite(sys.argv[1], sys.argv[2]).items():
+        print(f"{category}: {count}")
@@ -0,0 +1,96 @@
+import csv
+import json
+import os
+from storage.sqlite_manager import COLUMNS
+
+# Streams collections to and from CSV or NDJSON a chunk at a time, so memory
+# stays flat however large the files are. Password hashes are only exported
+# on request (password_hashes=True), for moving users between stores;
+# otherwise a users file being imported carries plain passwords, as for
+# registration.
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 1000
+EXPORT_FIELDS = {category: tuple(column for column in columns if column != 'password')
+                 for category, columns in COLUMNS.items()}
+
+def collection_path(directory, category, fmt):
+    return os.path.join(directory, f"{category}.{fmt}")
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+def _exported(record, fields):
+    # Only the fields the record has.
+    return {field: record[field] for field in fields if field in record}
+
+def write_records(file, category, chunks, fmt, password_hashes=False):
+    # Returns the number of records written.
+    _check_format(fmt)
+    fields = COLUMNS[category] if password_hashes else EXPORT_FIELDS[category]
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(fields)
+        for chunk in chunks:
+            for record in chunk:
+                record = _exported(record, fields)
+                writer.writerow([_csv_value(record.get(field)) for field in fields])
+            count += len(chunk)
+    else:
+        for chunk in chunks:
+            file.writelines(json.dumps(_exported(record, fields)) + '\n'
+                            for record in chunk)
+            count += len(chunk)
+    return count
+
+def read_records(file, fmt):
+    # Yields one dict per row. CSV cells come back as strings, with empty
+    # cells as None; the importer converts and validates them.
+    _check_format(fmt)
+    if fmt == 'csv':
+        for row in csv.DictReader(file):
+            yield {field: value if value != '' else None for field, value in row.items()}
+        return
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {line_number} is not valid JSON")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield record
+
+def export_collection(data_manager, category, path, fmt, chunk_size=CHUNK_SIZE,
+                      password_hashes=False):
+    with open(path, 'w', newline='' if fmt == 'csv' else None, encoding='utf-8') as file:
+        return write_records(file, category, data_manager.iter_records(category, chunk_size),
+                             fmt, password_hashes)
+
+def export_all(data_manager, directory, fmt, categories=None, chunk_size=CHUNK_SIZE,
+               password_hashes=False):
+    # Yields (category, path, count) as each collection is written.
+    _check_format(fmt)
+    os.makedirs(directory, exist_ok=True)
+    for category in categories or COLUMNS:
+        if category not in COLUMNS:
+            raise ValueError(f"Unknown collection: {category}")
+        path = collection_path(directory, category, fmt)
+        yield category, path, export_collection(data_manager, category, path, fmt, chunk_size,
+                                                password_hashes)
+
+def open_records(path, fmt):
+    # Generator that keeps the file open only while it is being read.
+    with open(path, newline='' if fmt == 'csv' else None, encoding='utf-8') as file:
+        yield from read_records(file, fmt)
@@ -0,0 +1,96 @@
+import argparse
+import gc
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from models.maintenance import MaintenanceRequest
+from models.payment import Payment
+from models.room import Room
+from models.user import Student
+
+# Replicas of the dict-based models as they were before __slots__, kept
+# here so the benchmark can report both sides of the comparison.
+class DictStudent:
+    def __init__(self, username, password, student_id, contact_info, gender, department, year):
+        self.username = username
+        self.password = password
+        self.role = "student"
+        self.student_id = student_id
+        self.contact_info = contact_info
+        self.gender = gender
+        self.department = department
+        self.year = year
+        self.room = None
+
+class DictRoom:
+    def __init__(self, room_number, capacity):
+        self.room_number = room_number
+        self.capacity = capacity
+        self.occupants = []
+
+class DictMaintenanceRequest:
+    def __init__(self, student, description):
+        self.id = str(uuid.uuid4())
+        self.student = student
+        self.description = description
+        self.status = "Pending"
+        self.created_at = datetime.now()
+
+class DictPayment:
+    def __init__(self, student, amount, due_date):
+        self.id = str(uuid.uuid4())
+        self.student = student
+        self.amount = amount
+        self.due_date = due_date
+        self.paid = False
+
+PASSWORD_HASH = "0" * 64
+DUE_DATE = datetime(2024, 9, 1)
+
+def make_student(cls, i):
+    return cls(f"student{i}", PASSWORD_HASH, f"S{i:07d}", f"student{i}@example.edu",
+               "F", "Engineering", "2")
+
+def make_students(cls, count):
+    if cls is Student:
+        return [Student(f"student{i}", PASSWORD_HASH, f"S{i:07d}", f"student{i}@example.edu",
+                        "F", "Engineering", "2", hashed=True) for i in range(count)]
+    return [make_student(cls, i) for i in range(count)]
+
+def bytes_per_object(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = factory(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+def run(count):
+    student = make_students(Student, 1)[0]
+    cases = [
+        ("Student", lambda n: make_students(DictStudent, n), lambda n: make_students(Student, n)),
+        ("Room", lambda n: [DictRoom(str(i), 2) for i in range(n)],
+         lambda n: [Room(str(i), 2) for i in range(n)]),
+        ("MaintenanceRequest",
+         lambda n: [DictMaintenanceRequest(student, "Leaking tap") for _ in range(n)],
+         lambda n: [MaintenanceRequest(student, "Leaking tap") for _ in range(n)]),
+        ("Payment",
+         lambda n: [DictPayment(student, 500.0, DUE_DATE + timedelta(days=i % 365))
+                    for i in range(n)],
+         lambda n: [Payment(student, 500.0, DUE_DATE + timedelta(days=i % 365))
+                    for i in range(n)]),
+    ]
+    print(f"{'model':<20} {'before':>10} {'after':>10} {'saved':>8}")
+    for name, before, after in cases:
+        before_bytes = bytes_per_object(before, count)
+        after_bytes = bytes_per_object(after, count)
+        saved = 1 - after_bytes / before_bytes
+        print(f"{name:<20} {before_bytes:>10.1f} {after_bytes:>10.1f} {saved:>7.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report bytes per model object before and "
+                                                 "after the __slots__ models.")
+    parser.add_argument("--count", type=int, default=100000)
+    run(parser.parse_args().count)
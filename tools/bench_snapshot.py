@@ -0,0 +1,62 @@
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+from storage.binary_snapshot import BinarySnapshotDataManager, SnapshotReader, json_to_binary
+from storage.data_manager import DataManager
+from tools.benchmark import start_system, summarize, timed
+from tools.generate_dataset import write_dataset
+
+def bench(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        samples.append(timed(function)[0])
+    return summarize(samples)
+
+def close_system(path):
+    start_system(path).close()
+
+def read_one(path, name):
+    with SnapshotReader(path) as reader:
+        return reader.read(name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare startup from the JSON snapshot with "
+                                                 "the binary snapshot format.")
+    parser.add_argument("--students", type=int, default=25000,
+                        help="payments default to four per student, so 25000 gives 150k+ records")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dms-snapshot-")
+    try:
+        json_path = os.path.join(workdir, "dormitory_data.json")
+        binary_path = os.path.join(workdir, "dormitory_data.dmsb")
+        counts = write_dataset(json_path, args.students, seed=args.seed)
+        start = time.perf_counter()
+        json_to_binary(json_path, binary_path)
+        print(f"records: {sum(counts.values())} ({', '.join(f'{k}={v}' for k, v in counts.items())})")
+        print(f"convert: {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"size: json {os.path.getsize(json_path) / 1e6:.1f} MB, "
+              f"binary {os.path.getsize(binary_path) / 1e6:.1f} MB\n")
+
+        results = {
+            "load_data json": bench(lambda: DataManager(json_path), args.repeat),
+            "load_data binary": bench(lambda: BinarySnapshotDataManager(binary_path), args.repeat),
+            "startup json": bench(lambda: close_system(json_path), args.repeat),
+            "startup binary": bench(lambda: close_system(binary_path), args.repeat),
+            "read rooms only": bench(lambda: read_one(binary_path, "rooms"), args.repeat),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'operation':<20} {'p50 ms':>10} {'max ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<20} {stats['p50_ms']:>10.1f} {stats['max_ms']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
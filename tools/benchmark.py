@@ -0,0 +1,184 @@
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from dormitory_system import DormitoryManagementSystem
+from tools.generate_dataset import (ADMIN_PASSWORD, ADMIN_USERNAME, STUDENT_PASSWORD,
+                                    write_dataset)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    position = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[position]
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+
+def start_system(path, **options):
+    dms = DormitoryManagementSystem(path, **options)
+    # Force every loader so startup is comparable with and without laziness.
+    _ = dms.rooms, dms.maintenance_requests, dms.payments
+    return dms
+
+def bench_startup(path, repeat, options):
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        elapsed, dms = timed(start_system, path, **options)
+        samples.append(elapsed)
+        dms.close()
+        del dms
+    gc.collect()
+    tracemalloc.start()
+    dms = start_system(path, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return samples, peak, dms
+
+def run(path, iterations, write_iterations, repeat, seed, options):
+    rng = random.Random(seed)
+    results = {}
+    samples, startup_peak, dms = bench_startup(path, repeat, options)
+    results["startup"] = summarize(samples)
+
+    students = [user for user in dms.authenticator.users if hasattr(user, "student_id")]
+    sample = [rng.choice(students) for _ in range(iterations)]
+
+    results["login"] = summarize(
+        [timed(dms.login, student.username, STUDENT_PASSWORD)[0] for student in sample])
+    results["search_student"] = summarize(
+        [timed(dms.search_student, student.student_id)[0] for student in sample])
+    results["check_payment_due"] = summarize(
+        [timed(dms.check_payment_due, student)[0] for student in sample])
+
+    dms.login(ADMIN_USERNAME, ADMIN_PASSWORD)
+    unallocated = dms.unallocated_students()
+    rng.shuffle(unallocated)
+    samples = []
+    for student in unallocated[:write_iterations]:
+        vacant = dms.search_vacant_rooms()
+        if not vacant:
+            break
+        samples.append(timed(dms.allocate_room, student, rng.choice(vacant))[0])
+    if samples:
+        results["allocate_room"] = summarize(samples)
+
+    due_date = datetime.now() + timedelta(days=30)
+    results["create_payment"] = summarize(
+        [timed(dms.create_payment, student, 500.0, due_date)[0]
+         for student in sample[:write_iterations]])
+    results["save_data"] = summarize(
+        [timed(dms.data_manager.save_data)[0] for _ in range(max(1, write_iterations // 4))])
+    dms.close()
+
+    memory = {"startup_peak_traced_mb": startup_peak / (1024 * 1024)}
+    rss = peak_rss_mb()
+    if rss is not None:
+        memory["peak_rss_mb"] = rss
+    return {"operations": results, "memory": memory}
+
+def compare(results, baseline, threshold, min_delta_ms=0.05):
+    print(f"\n{'operation':<20} {'baseline p50':>14} {'current p50':>14} {'change':>9}")
+    regressions = []
+    for name, current in results["operations"].items():
+        previous = baseline["operations"].get(name)
+        if not previous:
+            continue
+        change = current["p50_ms"] / previous["p50_ms"] - 1 if previous["p50_ms"] else 0.0
+        # Operations taking a few microseconds swing by more than the
+        # threshold from run to run; below the floor a change is noise.
+        slower = current["p50_ms"] - previous["p50_ms"] >= min_delta_ms
+        flag = " !" if change > threshold and slower else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<20} {previous['p50_ms']:>14.3f} {current['p50_ms']:>14.3f} "
+              f"{change:>+8.1%}{flag}")
+    return regressions
+
+def report(results):
+    print(f"{'operation':<20} {'count':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} "
+          f"{'max ms':>10}")
+    for name, stats in results["operations"].items():
+        print(f"{name:<20} {stats['count']:>6} {stats['p50_ms']:>10.3f} {stats['p90_ms']:>10.3f} "
+              f"{stats['p99_ms']:>10.3f} {stats['max_ms']:>10.3f}")
+    for name, value in results["memory"].items():
+        print(f"{name}: {value:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DormitoryManagementSystem hot "
+                                                 "paths against a generated dataset.")
+    parser.add_argument("--data", help="existing dataset to copy and benchmark")
+    parser.add_argument("--students", type=int, default=10000,
+                        help="size of the generated dataset when --data is not given")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--write-iterations", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="startup repetitions")
+    parser.add_argument("--journal", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="p50 slowdown flagged as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="smallest p50 slowdown, in ms, flagged as a regression")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dms-bench-")
+    try:
+        if args.data:
+            path = os.path.join(workdir, os.path.basename(args.data))
+            shutil.copy(args.data, path)
+        else:
+            path = os.path.join(workdir, "dormitory_data.json")
+            write_dataset(path, args.students, seed=args.seed)
+        options = {"journal": True} if args.journal else {}
+        results = run(path, args.iterations, args.write_iterations, args.repeat, args.seed,
+                      options)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report(results)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressions: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
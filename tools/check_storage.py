@@ -0,0 +1,72 @@
+import argparse
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from dormitory_system import DormitoryManagementSystem
+from storage.transfer import COLUMNS
+
+# Writes a little of everything through each backend, reopens the file and
+# checks the records read back match what was written, so a write that is
+# lost or applied twice on reload shows up.
+BACKENDS = (
+    ("json", "data.json", {}),
+    ("json, journal", "data.json", {"journal": True}),
+    ("json, group commit", "data.json", {"group_commit": 0.01}),
+    ("binary", "data.dmsb", {}),
+    ("binary, journal", "data.dmsb", {"journal": True}),
+    ("sqlite", "data.db", {}),
+)
+
+def write_sample(dms):
+    admin = dms.register_user("admin", "admin", "admin")
+    dms.current_user = admin
+    students = [dms.register_user(f"student{i}", "password", "student", student_id=f"S{i}",
+                                  contact_info="", gender="F", department="CS", year="1")
+                for i in range(3)]
+    dms.add_room("101", 2)
+    dms.add_room("102", 1)
+    dms.allocate_room(students[0], dms.get_room("101"))
+    payment = dms.create_payment(students[0], 250.0, datetime(2024, 1, 31))
+    dms.create_payment(students[1], 250.0, datetime(2024, 2, 29))
+    dms.mark_payment_paid(payment.id)
+    dms.current_user = students[1]
+    request = dms.create_maintenance_request("Window does not close")
+    dms.current_user = admin
+    dms.update_maintenance_request(request.id, "In Progress")
+
+def snapshot(dms):
+    return {category: sorted(map(repr, map(sorted, (record.items() for record in
+                                                    dms.data_manager.get_records(category)))))
+            for category in COLUMNS}
+
+def check(path, options):
+    dms = DormitoryManagementSystem(path, **options)
+    write_sample(dms)
+    written = snapshot(dms)
+    dms.close()
+    dms = DormitoryManagementSystem(path, **options)
+    reloaded = snapshot(dms)
+    dms.close()
+    return [category for category in COLUMNS if written[category] != reloaded[category]]
+
+def main():
+    argparse.ArgumentParser(description="Check that every storage backend reads back "
+                                        "exactly what it wrote.").parse_args()
+    failures = 0
+    for name, file_name, options in BACKENDS:
+        workdir = tempfile.mkdtemp(prefix="dms-check-")
+        try:
+            mismatched = check(os.path.join(workdir, file_name), options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if mismatched:
+            failures += 1
+            print(f"{name}: reload differs in {', '.join(mismatched)}")
+        else:
+            print(f"{name}: ok")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
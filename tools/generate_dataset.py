@@ -0,0 +1,136 @@
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from models.user import hash_password
+
+GENDERS = ("Male", "Female")
+DEPARTMENTS = ("Computer Science", "Engineering", "Medicine", "Law", "Economics",
+               "Mathematics", "Physics", "Chemistry", "History", "Architecture")
+YEARS = ("1", "2", "3", "4", "5")
+STATUSES = ("Pending", "In Progress", "Resolved")
+ISSUES = ("Leaking tap", "Heater not working", "Broken window", "Blocked drain",
+          "Faulty light", "Door lock stuck", "Mould on ceiling", "No hot water",
+          "Wi-Fi down", "Broken bed frame", "Power socket sparking", "Toilet leak")
+PLACES = ("in the bathroom", "in the kitchen", "in my room", "in the hallway",
+          "near the window", "on the second floor", "in the shower")
+AMOUNTS = (250.0, 500.0, 750.0, 1000.0, 1500.0)
+
+STUDENT_PASSWORD = "password"
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin"
+
+def student_id(i):
+    return f"S{i:07d}"
+
+def random_id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def random_datetime(rng, start, days):
+    return start + timedelta(seconds=rng.randrange(days * 86400))
+
+def plan_rooms(rng, rooms, students, occupancy):
+    capacities = [rng.choice((1, 2, 2, 3, 4)) for _ in range(rooms)]
+    occupants = [[] for _ in range(rooms)]
+    placed = {}
+    slots = [room for room, capacity in enumerate(capacities) for _ in range(capacity)]
+    rng.shuffle(slots)
+    housed = min(int(students * occupancy), len(slots))
+    for i, room in zip(rng.sample(range(students), housed), slots):
+        occupants[room].append(student_id(i))
+        placed[i] = room
+    return capacities, occupants, placed
+
+def generate_users(rng, students, placed):
+    yield {"username": ADMIN_USERNAME, "password": hash_password(ADMIN_PASSWORD), "role": "admin"}
+    yield {"username": "manager", "password": hash_password("manager"), "role": "manager"}
+    password = hash_password(STUDENT_PASSWORD)
+    for i in range(students):
+        room = placed.get(i)
+        yield {
+            "username": f"student{i}",
+            "password": password,
+            "role": "student",
+            "student_id": student_id(i),
+            "contact_info": f"student{i}@example.edu",
+            "gender": rng.choice(GENDERS),
+            "department": rng.choice(DEPARTMENTS),
+            "year": rng.choice(YEARS),
+            "room": f"R{room:06d}" if room is not None else None,
+        }
+
+def generate_rooms(capacities, occupants):
+    for room, capacity in enumerate(capacities):
+        yield {"room_number": f"R{room:06d}", "capacity": capacity, "occupants": occupants[room]}
+
+def generate_requests(rng, count, students, start, days):
+    for _ in range(count):
+        yield {
+            "id": random_id(rng),
+            "student": student_id(rng.randrange(students)),
+            "description": f"{rng.choice(ISSUES)} {rng.choice(PLACES)}",
+            "status": rng.choice(STATUSES),
+            "created_at": random_datetime(rng, start, days).isoformat(),
+        }
+
+def generate_payments(rng, count, students, start, days, now):
+    for _ in range(count):
+        due_date = random_datetime(rng, start, days)
+        yield {
+            "id": random_id(rng),
+            "student": student_id(rng.randrange(students)),
+            "amount": rng.choice(AMOUNTS),
+            "due_date": due_date.isoformat(),
+            "paid": due_date < now and rng.random() < 0.85,
+        }
+
+def write_collection(file, name, records, last=False):
+    file.write(f'  "{name}": [')
+    separator = "\n    "
+    for record in records:
+        file.write(separator + json.dumps(record))
+        separator = ",\n    "
+    file.write("\n  ]" + ("\n" if last else ",\n"))
+
+def write_dataset(path, students=1000, rooms=None, requests=None, payments=None,
+                  occupancy=0.8, years=3, seed=0):
+    rng = random.Random(seed)
+    rooms = rooms if rooms is not None else max(1, students // 2)
+    requests = requests if requests is not None else students
+    payments = payments if payments is not None else students * 4
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=365 * years)
+    days = 365 * years + 90
+    capacities, occupants, placed = plan_rooms(rng, rooms, students, occupancy)
+    # Collections are streamed record by record, so memory is bounded by
+    # the room plan rather than the number of requests and payments.
+    with open(path, "w") as file:
+        file.write("{\n")
+        write_collection(file, "users", generate_users(rng, students, placed))
+        write_collection(file, "rooms", generate_rooms(capacities, occupants))
+        write_collection(file, "maintenance_requests",
+                         generate_requests(rng, requests, students, start, days))
+        write_collection(file, "payments",
+                         generate_payments(rng, payments, students, start, days, now), last=True)
+        file.write("}\n")
+    return {"users": students + 2, "rooms": rooms, "maintenance_requests": requests,
+            "payments": payments}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset in the DataManager "
+                                                 "JSON format.")
+    parser.add_argument("output")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, help="default: students / 2")
+    parser.add_argument("--requests", type=int, help="default: one per student")
+    parser.add_argument("--payments", type=int, help="default: four per student")
+    parser.add_argument("--occupancy", type=float, default=0.8,
+                        help="share of students already housed")
+    parser.add_argument("--years", type=int, default=3, help="years of history to spread over")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = write_dataset(args.output, args.students, args.rooms, args.requests, args.payments,
+                           args.occupancy, args.years, args.seed)
+    for name, count in counts.items():
+        print(f"{name}: {count}")
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from tools.benchmark import summarize
+from tools.generate_dataset import (ADMIN_PASSWORD, ADMIN_USERNAME, STUDENT_PASSWORD,
+                                    student_id)
+
+READS = ('whoami', 'my_payments', 'my_maintenance_requests', 'payment_due')
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, host, port, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def call(self, op, **args):
+        self._next_id += 1
+        request = {'id': self._next_id, 'op': op, 'args': args}
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if 'error' in response:
+            raise ValueError(f"{op}: {response['error']}")
+        return response['result']
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def student_session(client, username, deadline, write_ratio, rng, latencies):
+    await client.call('login', username=username, password=STUDENT_PASSWORD)
+    while time.perf_counter() < deadline:
+        if rng.random() < write_ratio:
+            op, args = 'create_maintenance_request', {'description': "Load test request"}
+        else:
+            op, args = rng.choice(READS), {}
+        start = time.perf_counter()
+        await client.call(op, **args)
+        latencies.setdefault(op, []).append(time.perf_counter() - start)
+
+async def admin_session(client, students, deadline, rng, latencies):
+    await client.call('login', username=ADMIN_USERNAME, password=ADMIN_PASSWORD)
+    due_date = (datetime.now() + timedelta(days=30)).isoformat()
+    while time.perf_counter() < deadline:
+        op, args = rng.choice((
+            ('occupancy', {}),
+            ('maintenance_requests', {'status': "Pending", 'limit': 20}),
+            ('overdue_payments', {'limit': 20}),
+            ('create_payment', {'student_id': student_id(rng.randrange(students)),
+                                'amount': 500.0, 'due_date': due_date}),
+        ))
+        start = time.perf_counter()
+        await client.call(op, **args)
+        latencies.setdefault(op, []).append(time.perf_counter() - start)
+
+async def run(args):
+    rng = random.Random(args.seed)
+    latencies = {}
+    clients = [await Client.connect(args.host, args.port, args.unix)
+               for _ in range(args.clients + args.admins)]
+    start = time.perf_counter()
+    deadline = start + args.duration
+    sessions = [student_session(client, f"student{rng.randrange(args.students)}", deadline,
+                                args.write_ratio, random.Random(rng.random()), latencies)
+                for client in clients[:args.clients]]
+    sessions += [admin_session(client, args.students, deadline, random.Random(rng.random()),
+                               latencies)
+                 for client in clients[args.clients:]]
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return elapsed, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a running dormitory server with many "
+                                                 "concurrent sessions and report throughput.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent student sessions")
+    parser.add_argument("--admins", type=int, default=2, help="concurrent admin sessions")
+    parser.add_argument("--students", type=int, default=1000,
+                        help="number of students in the served dataset (student0..N-1)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--write-ratio", type=float, default=0.1,
+                        help="share of student requests that create a maintenance request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    elapsed, latencies = asyncio.run(run(args))
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{total} requests in {elapsed:.1f} s: {total / elapsed:.0f} requests/s")
+    print(f"{'operation':<28} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for op, samples in sorted(latencies.items()):
+        stats = summarize(samples)
+        print(f"{op:<28} {stats['count']:>6} {stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()